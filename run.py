@@ -1,19 +1,22 @@
 import argparse
 import logging
 import os
+from dataclasses import replace
 from pathlib import Path
 
-from src.config import AppConfig, ExportConfig, mode_defaults
+from src.config import AppConfig, ExportConfig, MotionConfig, ParallelConfig, mode_defaults
 
 
 def parse_args(argv=None) -> argparse.Namespace:
-from src.pipeline import Pipeline
-
-
-def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="CPU-first ONNX detector pipeline")
     parser.add_argument("--model-path", type=Path, required=True, help="Ruta al modelo ONNX.")
     parser.add_argument("--source", type=str, default="0", help="Ruta a video/imagen o webcam id.")
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=None,
+        help="Varias fuentes (archivos o ids de cámara) procesadas en un solo proceso; reemplaza --source.",
+    )
     parser.add_argument("--output", type=Path, default=None, help="Ruta opcional para video de salida.")
     parser.add_argument("--events-csv", type=Path, default=None, help="Archivo de eventos (CSV).")
     parser.add_argument("--every-n-frames", type=int, default=None, help="Procesar cada n frames (default por modo).")
@@ -29,81 +32,171 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--rois", type=Path, default=None, help="Ruta a config/rois.json")
     parser.add_argument("--approach-seconds", type=float, default=1.0, help="Tiempo mínimo dentro de ROI para 'Approach'.")
     parser.add_argument("--pick-area-delta", type=float, default=0.2, help="Delta relativa de área bbox para inferir 'Pick' sin pose.")
+    parser.add_argument(
+        "--roi-crop",
+        action="store_true",
+        help="Detecta solo en recortes alrededor de los ROIs (requiere --rois).",
+    )
+    parser.add_argument(
+        "--roi-crop-margin",
+        type=float,
+        default=0.25,
+        help="Margen de los recortes de ROI como fracción de su tamaño.",
+    )
+    parser.add_argument(
+        "--tracker",
+        choices=["iou", "kalman"],
+        default=None,
+        help="Tracker: iou (caja anterior) o kalman (predice la posición entre frames procesados).",
+    )
+    parser.add_argument(
+        "--interpolate",
+        action="store_true",
+        help="Exporta cajas interpoladas para los frames saltados por --every-n-frames/--seek-stride.",
+    )
     parser.add_argument("--enable-pose", action="store_true", help="Activa estimación de pose para mejorar 'Pick'.")
     parser.add_argument("--pose-model", type=Path, default=None, help="Ruta al modelo ONNX de pose (opcional).")
+    parser.add_argument(
+        "--pose-full-frame",
+        action="store_true",
+        help="Pose sobre el frame completo (un esqueleto) en vez de recortes de los tracks dentro de ROIs.",
+    )
+    parser.add_argument("--prefetch", type=int, default=None, help="Frames a decodificar por adelantado en un hilo (0 = desactivado).")
+    parser.add_argument(
+        "--prefetch-drop",
+        choices=["block", "oldest", "newest"],
+        default=None,
+        help="Política si la cola de prefetch está llena (block para archivos, oldest para cámaras en vivo).",
+    )
+    parser.add_argument(
+        "--seek-stride",
+        type=int,
+        default=None,
+        help="En archivos, saltar con seek cuando every-n-frames >= este valor (0 = solo grab).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Frames agrupados por inferencia ONNX (útil en videos offline; 1 = frame a frame).",
+    )
+    parser.add_argument("--class-aware-nms", action="store_true", help="Aplica NMS por clase en lugar de global.")
+    parser.add_argument("--intra-op-threads", type=int, default=None, help="Hilos intra-op del detector (0 = automático).")
+    parser.add_argument("--inter-op-threads", type=int, default=None, help="Hilos inter-op del detector (0 = automático).")
+    parser.add_argument("--pose-intra-op-threads", type=int, default=None, help="Hilos intra-op del modelo de pose.")
+    parser.add_argument(
+        "--graph-opt",
+        choices=["disable", "basic", "extended", "all"],
+        default=None,
+        help="Nivel de optimización de grafo de ONNX Runtime.",
+    )
+    parser.add_argument("--execution-mode", choices=["sequential", "parallel"], default=None, help="Modo de ejecución ORT.")
+    parser.add_argument("--no-mem-arena", action="store_true", help="Desactiva el arena de memoria CPU de ORT.")
+    parser.add_argument(
+        "--spin",
+        choices=["on", "off"],
+        default=None,
+        help="Spinning de hilos ORT (on = menor latencia, off = no consume CPU en espera).",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=None,
+        help="Divide un archivo largo en N segmentos procesados en paralelo (>1 activa el modo).",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para el modo por segmentos (default: núcleos).")
+    parser.add_argument(
+        "--segment-overlap",
+        type=float,
+        default=None,
+        help="Segundos de solapamiento entre segmentos para unir tracks (default 4).",
+    )
+    parser.add_argument("--motion-gate", action="store_true", help="Omite el detector en frames sin movimiento.")
+    parser.add_argument("--motion-method", choices=["diff", "mog2"], default=None, help="Método del gate de movimiento.")
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=None,
+        help="Fracción de píxeles cambiados para considerar movimiento (default 0.005).",
+    )
+    parser.add_argument(
+        "--motion-max-skip",
+        type=int,
+        default=None,
+        help="Forzar detección tras N frames estáticos seguidos (0 = nunca).",
+    )
     return parser.parse_args(argv)
-    return parser.parse_args(argv)
-    return parser.parse_args(argv)
-    return parser.parse_args()
 
 
 def build_config(args: argparse.Namespace) -> AppConfig:
     defaults = mode_defaults(args.mode)
+    spinning = None if args.spin is None else args.spin == "on"
+    det_session = defaults.detector.session.override(
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+        graph_optimization=args.graph_opt,
+        execution_mode=args.execution_mode,
+        enable_mem_arena=False if args.no_mem_arena else None,
+        allow_spinning=spinning,
+    )
+    pose_session = defaults.pose.session.override(
+        intra_op_threads=args.pose_intra_op_threads,
+        graph_optimization=args.graph_opt,
+        enable_mem_arena=False if args.no_mem_arena else None,
+    )
     max_frames = args.max_frames if args.max_frames is not None else (100 if args.dry_run else None)
     return AppConfig(
         mode=args.mode,
         model_path=args.model_path,
-        source=args.source,
+        source=args.sources[0] if args.sources else args.source,
+        sources=tuple(args.sources or ()),
         output=args.output,
         max_frames=max_frames,
         dry_run=args.dry_run,
         rois_path=args.rois,
         approach_seconds=args.approach_seconds,
         pick_area_delta=args.pick_area_delta,
-        video=defaults.video.override(imgsz=args.imgsz, every_n_frames=args.every_n_frames),
-        detector=defaults.detector.override(conf=args.conf, iou=args.iou, imgsz=args.imgsz),
-        tracker=defaults.tracker,
-        pose=defaults.pose.__class__(enabled=args.enable_pose, model_path=args.pose_model, conf=0.25, imgsz=256),
+        roi_crop=args.roi_crop,
+        roi_crop_margin=args.roi_crop_margin,
+        video=defaults.video.override(
+            imgsz=args.imgsz,
+            every_n_frames=args.every_n_frames,
+            prefetch=args.prefetch,
+            prefetch_drop=args.prefetch_drop,
+            seek_stride=args.seek_stride,
+        ),
+        detector=replace(
+            defaults.detector.override(conf=args.conf, iou=args.iou, imgsz=args.imgsz, batch_size=args.batch_size),
+            session=det_session,
+            class_aware_nms=args.class_aware_nms or defaults.detector.class_aware_nms,
+        ),
+        tracker=replace(
+            defaults.tracker,
+            kind=args.tracker or defaults.tracker.kind,
+            interpolate=args.interpolate or defaults.tracker.interpolate,
+        ),
+        pose=replace(
+            defaults.pose,
+            enabled=args.enable_pose,
+            model_path=args.pose_model,
+            session=pose_session,
+            top_down=not args.pose_full_frame,
+        ),
         export=ExportConfig(json_path=args.save_json, csv_path=args.save_csv, events_path=args.events_csv),
+        motion=MotionConfig(
+            enabled=args.motion_gate,
+            method=args.motion_method or defaults.motion.method,
+            threshold=args.motion_threshold if args.motion_threshold is not None else defaults.motion.threshold,
+            pixel_delta=defaults.motion.pixel_delta,
+            width=defaults.motion.width,
+            max_skip=args.motion_max_skip if args.motion_max_skip is not None else defaults.motion.max_skip,
+        ),
+        parallel=ParallelConfig(
+            segments=args.segments if args.segments is not None else defaults.parallel.segments,
+            workers=args.workers if args.workers is not None else defaults.parallel.workers,
+            overlap_seconds=args.segment_overlap if args.segment_overlap is not None else defaults.parallel.overlap_seconds,
+        ),
     )
-        export=ExportConfig(json_path=args.save_json, csv_path=args.save_csv, events_path=args.events_csv),
-    )
-        max_frames=args.max_frames,
-        video=defaults.video.override(imgsz=args.imgsz, every_n_frames=args.every_n_frames),
-        detector=defaults.detector.override(conf=args.conf, iou=args.iou, imgsz=args.imgsz),
-        tracker=defaults.tracker,
-        export=ExportConfig(json_path=args.save_json, csv_path=args.save_csv),
-    )
-from __future__ import annotations
-
-import argparse
-import logging
-import time
-from pathlib import Path
-from typing import List
-
-import cv2
-from tqdm import tqdm
-
-from src.detector import YoloV8OnnxDetector
-from src.tracking import build_tracker, detections_to_norfair
-from src.video_utils import (
-    COCO_CLASSES,
-    FrameTimings,
-    compute_run_stats,
-    draw_detections,
-    ensure_dir,
-    maybe_resize,
-    timestamp_from_frame,
-    write_run_log,
-    write_tracks_csv,
-)
-
-logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
-
-
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="CPU-only YOLOv8 ONNX detection + Norfair tracking")
-    parser.add_argument("--video-path", required=True, help="Path to local input video")
-    parser.add_argument("--model-path", default="models/yolov8n.onnx", help="Path to YOLOv8n ONNX model")
-    parser.add_argument("--output-dir", default="outputs", help="Directory for annotated video and logs")
-    parser.add_argument("--resize", type=int, default=None, help="Optional target width to downscale frames (e.g., 1280)")
-    parser.add_argument("--every-n-frames", type=int, default=1, help="Process every Nth frame to speed up (e.g., 2 or 3)")
-    parser.add_argument("--img-size", type=int, default=640, help="Inference image size for YOLOv8 (square)")
-    parser.add_argument("--confidence", type=float, default=0.3, help="Confidence threshold")
-    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold for NMS")
-    parser.add_argument("--distance-threshold", type=float, default=0.7, help="Tracker distance threshold (lower = stricter)")
-    return parser.parse_args()
 
 
 def main() -> None:
@@ -122,14 +215,60 @@ def main() -> None:
     config = build_config(args)
     if config.output:
         config.output.parent.mkdir(parents=True, exist_ok=True)
+    if len(config.sources) > 1:
+        from src.multi_stream import MultiStreamPipeline
+
+        MultiStreamPipeline(config).run()
+        return
+    if config.parallel.segments > 1:
+        from src.segments import run_segmented
+
+        run_segmented(config)
+        return
     from src.pipeline import Pipeline
 
     pipeline = Pipeline(config)
     pipeline.run()
-    config = build_config(args)
-    os.makedirs(config.output.parent, exist_ok=True) if config.output else None
-    pipeline = Pipeline(config)
-    pipeline.run()
+
+
+def parse_legacy_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="CPU-only YOLOv8 ONNX detection + Norfair tracking")
+    parser.add_argument("--video-path", required=True, help="Path to local input video")
+    parser.add_argument("--model-path", default="models/yolov8n.onnx", help="Path to YOLOv8n ONNX model")
+    parser.add_argument("--output-dir", default="outputs", help="Directory for annotated video and logs")
+    parser.add_argument("--resize", type=int, default=None, help="Optional target width to downscale frames (e.g., 1280)")
+    parser.add_argument("--every-n-frames", type=int, default=1, help="Process every Nth frame to speed up (e.g., 2 or 3)")
+    parser.add_argument("--img-size", type=int, default=640, help="Inference image size for YOLOv8 (square)")
+    parser.add_argument("--confidence", type=float, default=0.3, help="Confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold for NMS")
+    parser.add_argument("--distance-threshold", type=float, default=0.7, help="Tracker distance threshold (lower = stricter)")
+    return parser.parse_args(argv)
+
+
+def legacy_main(argv=None) -> None:
+    """Flujo original YOLOv8 + Norfair (sin ROIs ni eventos)."""
+    import time
+    from typing import List
+
+    import cv2
+    from tqdm import tqdm
+
+    from src.detector import YoloV8OnnxDetector
+    from src.tracking import build_tracker, detections_to_norfair
+    from src.video_utils import (
+        COCO_CLASSES,
+        FrameTimings,
+        compute_run_stats,
+        draw_detections,
+        ensure_dir,
+        maybe_resize,
+        timestamp_from_frame,
+        write_run_log,
+        write_tracks_csv,
+    )
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    args = parse_legacy_args(argv)
     video_path = Path(args.video_path)
     model_path = Path(args.model_path)
     output_dir = Path(args.output_dir)
@@ -224,5 +363,6 @@ def main() -> None:
     logging.info("Run log at %s", log_path)
 
 
+
 if __name__ == "__main__":
     main()
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 
 @dataclass(frozen=True)
@@ -10,12 +11,58 @@ class VideoConfig:
     source: str = "0"
     imgsz: int = 640
     every_n_frames: int = 2
-
-    def override(self, *, imgsz: Optional[int] = None, every_n_frames: Optional[int] = None) -> "VideoConfig":
+    prefetch: int = 0  # profundidad de la cola de decodificación anticipada (0 = desactivado)
+    prefetch_drop: str = "block"  # block | oldest | newest
+    seek_stride: int = 0  # usar seek en archivos si every_n_frames >= seek_stride (0 = solo grab)
+
+    def override(
+        self,
+        *,
+        imgsz: Optional[int] = None,
+        every_n_frames: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        prefetch_drop: Optional[str] = None,
+        seek_stride: Optional[int] = None,
+    ) -> "VideoConfig":
         return replace(
             self,
             imgsz=imgsz if imgsz is not None else self.imgsz,
             every_n_frames=every_n_frames if every_n_frames is not None else self.every_n_frames,
+            prefetch=prefetch if prefetch is not None else self.prefetch,
+            prefetch_drop=prefetch_drop if prefetch_drop is not None else self.prefetch_drop,
+            seek_stride=seek_stride if seek_stride is not None else self.seek_stride,
+        )
+
+
+@dataclass(frozen=True)
+class SessionConfig:
+    """Ajustes de ``ort.SessionOptions``; 0 hilos = decide ONNX Runtime."""
+
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    graph_optimization: str = "all"  # disable | basic | extended | all
+    execution_mode: str = "sequential"  # sequential | parallel
+    enable_mem_arena: bool = True
+    allow_spinning: bool = True
+
+    def override(
+        self,
+        *,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        graph_optimization: Optional[str] = None,
+        execution_mode: Optional[str] = None,
+        enable_mem_arena: Optional[bool] = None,
+        allow_spinning: Optional[bool] = None,
+    ) -> "SessionConfig":
+        return replace(
+            self,
+            intra_op_threads=intra_op_threads if intra_op_threads is not None else self.intra_op_threads,
+            inter_op_threads=inter_op_threads if inter_op_threads is not None else self.inter_op_threads,
+            graph_optimization=graph_optimization if graph_optimization is not None else self.graph_optimization,
+            execution_mode=execution_mode if execution_mode is not None else self.execution_mode,
+            enable_mem_arena=enable_mem_arena if enable_mem_arena is not None else self.enable_mem_arena,
+            allow_spinning=allow_spinning if allow_spinning is not None else self.allow_spinning,
         )
 
 
@@ -24,13 +71,24 @@ class DetectorConfig:
     conf: float = 0.25
     iou: float = 0.45
     imgsz: int = 640
-
-    def override(self, *, conf: Optional[float] = None, iou: Optional[float] = None, imgsz: Optional[int] = None) -> "DetectorConfig":
+    batch_size: int = 1  # frames por session.run (>1 agrupa frames en [N,3,H,W])
+    class_aware_nms: bool = False  # NMS por clase en lugar de global
+    session: SessionConfig = field(default_factory=SessionConfig)
+
+    def override(
+        self,
+        *,
+        conf: Optional[float] = None,
+        iou: Optional[float] = None,
+        imgsz: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> "DetectorConfig":
         return replace(
             self,
             conf=conf if conf is not None else self.conf,
             iou=iou if iou is not None else self.iou,
             imgsz=imgsz if imgsz is not None else self.imgsz,
+            batch_size=batch_size if batch_size is not None else self.batch_size,
         )
 
 
@@ -39,6 +97,12 @@ class TrackerConfig:
     max_missed: int = 30
     min_hits: int = 1
     iou_match: float = 0.3
+    assignment: str = "hungarian"  # hungarian (óptima) | greedy (mayor IoU primero)
+    kind: str = "iou"  # iou | kalman (predice posiciones entre frames procesados)
+    interpolate: bool = False  # exportar cajas interpoladas para los frames saltados
+    history_size: int = 32  # cajas previas que guarda cada track (buffer circular)
+    grid_min_tracks: int = 150  # a partir de cuántos tracks se asocia con rejilla espacial (0 = nunca)
+    grid_cell_size: float = 0.0  # lado de celda en píxeles (0 = automático según el tamaño de las cajas)
 
 
 @dataclass(frozen=True)
@@ -46,6 +110,8 @@ class ExportConfig:
     json_path: Optional[Path] = None
     csv_path: Optional[Path] = None
     events_path: Optional[Path] = None
+    batch_rows: int = 512  # filas por bloque escrito por los exportadores en streaming
+    flush_seconds: float = 2.0  # tiempo máximo que una fila espera en memoria antes de escribirse
 
 
 @dataclass(frozen=True)
@@ -54,6 +120,27 @@ class PoseConfig:
     model_path: Optional[Path] = None
     conf: float = 0.25
     imgsz: int = 256
+    session: SessionConfig = field(default_factory=SessionConfig)
+    top_down: bool = True  # pose por recorte de cada track dentro de un ROI (False = frame completo)
+    crop_margin: float = 0.15  # ampliación del recorte por lado, como fracción de la caja
+    max_batch: int = 8  # recortes por session.run
+
+
+@dataclass(frozen=True)
+class MotionConfig:
+    enabled: bool = False
+    method: str = "diff"  # diff (diferencia con el último frame detectado) | mog2
+    threshold: float = 0.005  # fracción mínima de píxeles cambiados para detectar
+    pixel_delta: int = 25  # diferencia de gris para contar un píxel como cambiado
+    width: int = 160  # ancho de la imagen reducida usada por el gate
+    max_skip: int = 30  # forzar detección tras N frames sin movimiento (0 = nunca)
+
+
+@dataclass(frozen=True)
+class ParallelConfig:
+    segments: int = 0  # >1 divide un archivo en segmentos procesados en paralelo
+    workers: int = 0  # procesos del pool (0 = uno por segmento, acotado a los núcleos)
+    overlap_seconds: float = 4.0  # ventana compartida para unir tracks entre segmentos
 
 
 @dataclass(frozen=True)
@@ -67,20 +154,38 @@ class AppConfig:
     rois_path: Optional[Path] = None
     approach_seconds: float = 1.0
     pick_area_delta: float = 0.2
+    roi_crop: bool = False  # detectar solo en recortes alrededor de los ROIs
+    roi_crop_margin: float = 0.25
     video: VideoConfig = field(default_factory=VideoConfig)
     detector: DetectorConfig = field(default_factory=DetectorConfig)
     tracker: TrackerConfig = field(default_factory=TrackerConfig)
     pose: PoseConfig = field(default_factory=PoseConfig)
     export: ExportConfig = field(default_factory=ExportConfig)
+    parallel: ParallelConfig = field(default_factory=ParallelConfig)
+    motion: MotionConfig = field(default_factory=MotionConfig)
+    sources: Tuple[str, ...] = ()  # >1 activa el modo multi-fuente (una sesión ONNX compartida)
+
+
+def _thread_layout(allow_spinning: bool) -> Tuple[SessionConfig, SessionConfig]:
+    # Reparto fijo de núcleos entre detector y pose para que ambas sesiones no
+    # compitan por los mismos hilos; queda holgura para decodificación.
+    cpus = os.cpu_count() or 1
+    pose_threads = max(1, cpus // 4)
+    det_threads = max(1, cpus - pose_threads)
+    detector = SessionConfig(intra_op_threads=det_threads, inter_op_threads=1, allow_spinning=allow_spinning)
+    pose = SessionConfig(intra_op_threads=pose_threads, inter_op_threads=1, allow_spinning=False)
+    return detector, pose
 
 
 def mode_defaults(mode: str) -> "AppConfig":
     if mode == "quality":
+        det_session, pose_session = _thread_layout(allow_spinning=True)
         video = VideoConfig(imgsz=896, every_n_frames=1)
-        detector = DetectorConfig(conf=0.28, iou=0.5, imgsz=896)
-    else:  # fast
+        detector = DetectorConfig(conf=0.28, iou=0.5, imgsz=896, session=det_session)
+    else:  # fast: sin spinning para no quemar CPU entre frames saltados
+        det_session, pose_session = _thread_layout(allow_spinning=False)
         video = VideoConfig(imgsz=640, every_n_frames=2)
-        detector = DetectorConfig(conf=0.23, iou=0.45, imgsz=640)
+        detector = DetectorConfig(conf=0.23, iou=0.45, imgsz=640, session=det_session)
 
     return AppConfig(
         mode=mode,
@@ -95,6 +200,8 @@ def mode_defaults(mode: str) -> "AppConfig":
         video=video,
         detector=detector,
         tracker=TrackerConfig(),
-        pose=PoseConfig(),
+        pose=PoseConfig(session=pose_session),
         export=ExportConfig(),
+        motion=MotionConfig(),
+        parallel=ParallelConfig(),
     )
@@ -8,6 +8,8 @@ from typing import List, Sequence, Tuple
 import numpy as np
 import onnxruntime as ort
 
+from .detector_onnx import batched_nms
+
 
 @dataclass
 class Detection:
@@ -66,16 +68,14 @@ class YoloV8OnnxDetector:
             return []
 
         boxes_xyxy = self._xywh_to_xyxy(boxes)
-        nms_indices = self._nms(boxes_xyxy, confidences, self.iou_threshold)
-
+        keep = batched_nms(boxes_xyxy, confidences, None, self.iou_threshold)
+        scaled = boxes_xyxy[keep] / gain
         detections: List[Detection] = []
-        for idx in nms_indices:
-            x1, y1, x2, y2 = boxes_xyxy[idx] / gain
-            class_id = int(class_ids[idx])
+        for bbox, score, class_id in zip(scaled.tolist(), confidences[keep].tolist(), class_ids[keep].tolist()):
             detections.append(
                 Detection(
-                    bbox=(float(x1), float(y1), float(x2), float(y2)),
-                    score=float(confidences[idx]),
+                    bbox=tuple(bbox),
+                    score=score,
                     class_id=class_id,
                     class_name=self.class_names[class_id] if class_id < len(self.class_names) else str(class_id),
                 )
@@ -87,31 +87,6 @@ class YoloV8OnnxDetector:
         x, y, w, h = xywh[:, 0], xywh[:, 1], xywh[:, 2], xywh[:, 3]
         return np.stack((x - w / 2, y - h / 2, x + w / 2, y + h / 2), axis=1)
 
-    @staticmethod
-    def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> List[int]:
-        """Simple non-maximum suppression."""
-        x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
-        areas = (x2 - x1) * (y2 - y1)
-        order = scores.argsort()[::-1]
-        keep: List[int] = []
-
-        while order.size > 0:
-            i = order[0]
-            keep.append(int(i))
-            xx1 = np.maximum(x1[i], x1[order[1:]])
-            yy1 = np.maximum(y1[i], y1[order[1:]])
-            xx2 = np.minimum(x2[i], x2[order[1:]])
-            yy2 = np.minimum(y2[i], y2[order[1:]])
-
-            w = np.maximum(0.0, xx2 - xx1)
-            h = np.maximum(0.0, yy2 - yy1)
-            inter = w * h
-            iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-6)
-            indices = np.where(iou <= iou_threshold)[0]
-            order = order[indices + 1]
-
-        return keep
-
 
 # Local import to avoid circular dependency in type checkers
 import cv2  # noqa: E402  # isort:skip
@@ -7,7 +7,46 @@ import cv2
 import numpy as np
 import onnxruntime as ort
 
-from src.config import DetectorConfig
+from src.config import DetectorConfig, SessionConfig
+
+
+_GRAPH_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def build_session_options(config: SessionConfig) -> ort.SessionOptions:
+    if config.graph_optimization not in _GRAPH_OPT_LEVELS:
+        raise ValueError(f"Nivel de optimización inválido: {config.graph_optimization}")
+    if config.execution_mode not in _EXECUTION_MODES:
+        raise ValueError(f"Modo de ejecución inválido: {config.execution_mode}")
+    options = ort.SessionOptions()
+    if config.intra_op_threads > 0:
+        options.intra_op_num_threads = config.intra_op_threads
+    if config.inter_op_threads > 0:
+        options.inter_op_num_threads = config.inter_op_threads
+    options.graph_optimization_level = _GRAPH_OPT_LEVELS[config.graph_optimization]
+    options.execution_mode = _EXECUTION_MODES[config.execution_mode]
+    options.enable_cpu_mem_arena = config.enable_mem_arena
+    if not config.allow_spinning:
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        options.add_session_config_entry("session.inter_op.allow_spinning", "0")
+    return options
+
+
+def create_session(model_path: str, config: SessionConfig) -> ort.InferenceSession:
+    return ort.InferenceSession(
+        model_path,
+        providers=["CPUExecutionProvider"],
+        sess_options=build_session_options(config),
+    )
 
 
 @dataclass
@@ -17,6 +56,28 @@ class Detection:
     cls: int
 
 
+@dataclass
+class DetectionArrays:
+    """Detecciones en formato columnar: ``boxes`` (N,4) xyxy, ``scores`` (N,), ``classes`` (N,)."""
+
+    boxes: "np.ndarray"
+    scores: "np.ndarray"
+    classes: "np.ndarray"
+
+    @classmethod
+    def empty(cls) -> "DetectionArrays":
+        return cls(np.zeros((0, 4), dtype=np.float32), np.zeros((0,), dtype=np.float32), np.zeros((0,), dtype=np.int64))
+
+    def __len__(self) -> int:
+        return int(self.scores.shape[0])
+
+    def to_list(self) -> List[Detection]:
+        return [
+            Detection(bbox=tuple(box), score=score, cls=cls)
+            for box, score, cls in zip(self.boxes.tolist(), self.scores.tolist(), self.classes.tolist())
+        ]
+
+
 def letterbox(image: "np.ndarray", size: int) -> Tuple["np.ndarray", float, Tuple[int, int]]:
     h, w = image.shape[:2]
     scale = min(size / h, size / w)
@@ -28,6 +89,80 @@ def letterbox(image: "np.ndarray", size: int) -> Tuple["np.ndarray", float, Tupl
     return canvas, scale, (left, top)
 
 
+@dataclass
+class _Geometry:
+    shape: Tuple[int, int]
+    scale: float
+    resized_hw: Tuple[int, int]
+    pad: Tuple[int, int]  # left, top
+    resized: "np.ndarray"
+
+
+class LetterboxPreprocessor:
+    """Letterbox + BGR→RGB + /255 + HWC→CHW sobre tensores preasignados.
+
+    La geometría de resize se cachea por resolución de origen y cada slot del
+    batch conserva su relleno (114) mientras la resolución no cambie, de modo
+    que en régimen estable no se reserva memoria por frame. El tensor devuelto
+    se reutiliza en la siguiente llamada.
+    """
+
+    def __init__(self, size: int, max_batch: int = 1, pad_value: int = 114):
+        self.size = size
+        self.pad_value = np.float32(pad_value) / np.float32(255.0)
+        self._tensor = np.empty((0, 3, size, size), dtype=np.float32)
+        self._slots: List[Optional[_Geometry]] = []
+        self._reserve(max_batch)
+
+    def _reserve(self, batch: int) -> None:
+        if batch <= self._tensor.shape[0]:
+            return
+        self._tensor = np.empty((batch, 3, self.size, self.size), dtype=np.float32)
+        self._slots = [None] * batch
+
+    def _geometry(self, shape: Tuple[int, int]) -> _Geometry:
+        h, w = shape
+        scale = min(self.size / h, self.size / w)
+        nh, nw = int(round(h * scale)), int(round(w * scale))
+        top, left = (self.size - nh) // 2, (self.size - nw) // 2
+        return _Geometry(shape, scale, (nh, nw), (left, top), np.empty((nh, nw, 3), dtype=np.uint8))
+
+    def _fill_slot(self, slot: int, image: "np.ndarray") -> Tuple[float, Tuple[int, int]]:
+        shape = image.shape[:2]
+        geo = self._slots[slot]
+        if geo is None or geo.shape != shape:
+            geo = self._geometry(shape)
+            self._slots[slot] = geo
+            self._tensor[slot].fill(self.pad_value)
+        nh, nw = geo.resized_hw
+        if (nh, nw) == shape:
+            resized = image
+        else:
+            resized = cv2.resize(image, (nw, nh), dst=geo.resized, interpolation=cv2.INTER_LINEAR)
+        left, top = geo.pad
+        # Una sola pasada: vista CHW con canales invertidos (BGR→RGB) dividida en el tensor destino.
+        np.divide(
+            resized.transpose(2, 0, 1)[::-1],
+            np.float32(255.0),
+            out=self._tensor[slot, :, top : top + nh, left : left + nw],
+            dtype=np.float32,
+        )
+        return geo.scale, geo.pad
+
+    def __call__(self, image: "np.ndarray") -> Tuple["np.ndarray", float, Tuple[int, int]]:
+        scale, pad = self._fill_slot(0, image)
+        return self._tensor[:1], scale, pad
+
+    def fill(
+        self, images: Sequence["np.ndarray"], batch: Optional[int] = None
+    ) -> Tuple["np.ndarray", List[Tuple[float, Tuple[int, int]]]]:
+        """Llena los primeros ``len(images)`` slots; ``batch`` fuerza el tamaño del tensor devuelto."""
+        batch = batch or len(images)
+        self._reserve(batch)
+        metas = [self._fill_slot(i, image) for i, image in enumerate(images)]
+        return self._tensor[:batch], metas
+
+
 def non_max_suppression(dets: "np.ndarray", iou_thresh: float) -> List[int]:
     x1 = dets[:, 0]
     y1 = dets[:, 1]
@@ -57,56 +192,164 @@ def non_max_suppression(dets: "np.ndarray", iou_thresh: float) -> List[int]:
     return keep
 
 
+# Por encima de este número de candidatos la matriz IoU (n×n) deja de compensar
+# y se usa el NMS greedy clásico.
+_MATRIX_NMS_LIMIT = 2048
+
+
+def pairwise_iou(boxes_a: "np.ndarray", boxes_b: "np.ndarray") -> "np.ndarray":
+    """IoU de todas las parejas entre ``boxes_a`` (N,4) y ``boxes_b`` (M,4) → (N,M)."""
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    inter_w = np.maximum(0.0, np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2]) - np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0]))
+    inter_h = np.maximum(0.0, np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3]) - np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1]))
+    inter = inter_w * inter_h
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def batched_nms(
+    boxes: "np.ndarray", scores: "np.ndarray", classes: Optional["np.ndarray"], iou_thresh: float
+) -> "np.ndarray":
+    """NMS vectorizado; devuelve índices conservados ordenados por score descendente.
+
+    Con ``classes`` el NMS es por clase (truco de offset: cada clase se desplaza
+    fuera del rango de las demás para que nunca se solapen). El resultado es el
+    mismo que el NMS greedy: se itera hasta el punto fijo de
+    ``keep[i] = no existe j < i conservado con IoU(j, i) > umbral``, lo que
+    requiere tantas pasadas como la longitud de la cadena de supresión más larga,
+    no una por caja.
+    """
+    if boxes.shape[0] == 0:
+        return np.zeros((0,), dtype=np.int64)
+    if classes is not None:
+        offset = float(boxes.max() - boxes.min()) + 1.0
+        boxes = boxes + (classes.astype(boxes.dtype) * offset)[:, None]
+    order = scores.argsort()[::-1]
+    if order.size > _MATRIX_NMS_LIMIT:
+        dets = np.concatenate([boxes, scores[:, None]], axis=1)
+        return np.asarray(non_max_suppression(dets, iou_thresh), dtype=np.int64)
+    sorted_boxes = boxes[order]
+    suppress = np.triu(pairwise_iou(sorted_boxes, sorted_boxes) > iou_thresh, k=1)
+    keep = np.ones(order.size, dtype=bool)
+    while True:
+        new_keep = ~(suppress & keep[:, None]).any(axis=0)
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+    return order[keep]
+
+
+def decode_predictions(
+    preds: "np.ndarray",
+    conf: float,
+    iou: float,
+    scale: float,
+    pad: Tuple[int, int],
+    orig_shape: Tuple[int, int],
+    class_aware: bool = False,
+) -> DetectionArrays:
+    """Filtra por confianza, aplica NMS y deshace el letterbox sobre filas ``[x1,y1,x2,y2,score,class]``."""
+    if preds.ndim == 3:
+        preds = preds[0]
+    if preds.ndim != 2 or preds.shape[1] < 6:
+        return DetectionArrays.empty()
+    preds = preds[preds[:, 4] >= conf]
+    if preds.size == 0:
+        return DetectionArrays.empty()
+    boxes = preds[:, :4]
+    scores = preds[:, 4]
+    classes = preds[:, 5]
+    keep = batched_nms(boxes, scores, classes if class_aware else None, iou)
+    boxes = (boxes[keep] - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=boxes.dtype)) / scale
+    h, w = orig_shape
+    np.clip(boxes, 0, np.array([w, h, w, h], dtype=boxes.dtype), out=boxes)
+    return DetectionArrays(boxes=boxes, scores=scores[keep], classes=classes[keep].astype(np.int64))
+
+
+def fixed_batch_size(session) -> Optional[int]:
+    # Los modelos exportados con batch dinámico declaran la dimensión como str/None.
+    dim = session.get_inputs()[0].shape[0]
+    return dim if isinstance(dim, int) and dim > 0 else None
+
+
 class OnnxDetector:
     def __init__(self, model_path: str, config: DetectorConfig):
         self.config = config
-        self.session = ort.InferenceSession(
-            model_path,
-            providers=["CPUExecutionProvider"],
-            sess_options=ort.SessionOptions(),
-        )
+        self.session = create_session(model_path, config.session)
         self.input_name = self.session.get_inputs()[0].name
         self.output_names = [o.name for o in self.session.get_outputs()]
+        self.fixed_batch = self._fixed_batch_size(self.session)
+        self.preprocessor = LetterboxPreprocessor(config.imgsz, max_batch=max(1, config.batch_size))
+
+    @staticmethod
+    def _fixed_batch_size(session) -> Optional[int]:
+        return fixed_batch_size(session)
 
     def preprocess(self, image: "np.ndarray") -> Tuple["np.ndarray", float, Tuple[int, int]]:
-        img, scale, pad = letterbox(image, self.config.imgsz)
-        img = img[:, :, ::-1]  # BGR to RGB
-        img = img.astype(np.float32) / 255.0
-        img = np.transpose(img, (2, 0, 1))[None, ...]
-        return img, scale, pad
+        return self.preprocessor(image)
 
     def postprocess(
         self, output: Sequence["np.ndarray"], scale: float, pad: Tuple[int, int], orig_shape: Tuple[int, int]
     ) -> List[Detection]:
-        preds = output[0]
-        if preds.ndim == 3:
-            preds = preds[0]
-        detections: List[Detection] = []
+        return self.postprocess_arrays(output, scale, pad, orig_shape).to_list()
 
+    def postprocess_arrays(
+        self, output: Sequence["np.ndarray"], scale: float, pad: Tuple[int, int], orig_shape: Tuple[int, int]
+    ) -> DetectionArrays:
         # Expecting [x1,y1,x2,y2,score,class]
-        if preds.shape[1] < 6:
-            return detections
-
-        mask = preds[:, 4] >= self.config.conf
-        preds = preds[mask]
-        if preds.size == 0:
-            return detections
-
-        keep = non_max_suppression(preds, self.config.iou)
-        for i in keep:
-            x1, y1, x2, y2, score, cls = preds[i, :6]
-            x1 = (x1 - pad[0]) / scale
-            x2 = (x2 - pad[0]) / scale
-            y1 = (y1 - pad[1]) / scale
-            y2 = (y2 - pad[1]) / scale
-            x1 = np.clip(x1, 0, orig_shape[1])
-            x2 = np.clip(x2, 0, orig_shape[1])
-            y1 = np.clip(y1, 0, orig_shape[0])
-            y2 = np.clip(y2, 0, orig_shape[0])
-            detections.append(Detection(bbox=(x1, y1, x2, y2), score=float(score), cls=int(cls)))
-        return detections
+        return decode_predictions(
+            output[0],
+            self.config.conf,
+            self.config.iou,
+            scale,
+            pad,
+            orig_shape,
+            class_aware=self.config.class_aware_nms,
+        )
 
     def __call__(self, image: "np.ndarray") -> List[Detection]:
         input_blob, scale, pad = self.preprocess(image)
         outputs = self.session.run(self.output_names, {self.input_name: input_blob})
         return self.postprocess(outputs, scale, pad, image.shape[:2])
+
+    def detect_batch(self, images: Sequence["np.ndarray"]) -> List[List[Detection]]:
+        """Detecta en varias imágenes con un único ``session.run`` sobre ``[N,3,H,W]``.
+
+        Si el modelo tiene batch fijo se procesa en bloques de ese tamaño (bucle
+        imagen a imagen cuando es 1). El resultado ``i`` corresponde a ``images[i]``.
+        """
+        return [arrays.to_list() for arrays in self.detect_batch_arrays(images)]
+
+    def detect_batch_arrays(self, images: Sequence["np.ndarray"]) -> List[DetectionArrays]:
+        if not images:
+            return []
+        chunk = self.fixed_batch or len(images)
+        results: List[DetectionArrays] = []
+        for start in range(0, len(images), chunk):
+            group = images[start : start + chunk]
+            # Con batch fijo, los slots sobrantes del último bloque se envían pero se ignoran.
+            batch, metas = self.preprocessor.fill(group, batch=chunk if self.fixed_batch else None)
+            outputs = self.session.run(self.output_names, {self.input_name: batch})
+            for i, (scale, pad) in enumerate(metas):
+                output = outputs[0] if chunk == 1 else [outputs[0][i]]
+                results.append(self.postprocess_arrays(output, scale, pad, group[i].shape[:2]))
+        return results
+
+    def detect_regions(self, image: "np.ndarray", regions: Sequence[Tuple[int, int, int, int]]) -> List[Detection]:
+        """Detecta solo dentro de ``regions`` (x1, y1, x2, y2) y devuelve cajas en coordenadas del frame.
+
+        Los recortes conservan su resolución original hasta el letterbox, así los
+        objetos pequeños de estanterías pierden menos detalle que con el frame completo.
+        """
+        if not regions:
+            return []
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        per_crop = self.detect_batch_arrays(crops)
+        offsets = np.array([[x1, y1, x1, y1] for x1, y1, _, _ in regions], dtype=np.float32)
+        merged = DetectionArrays(
+            boxes=np.concatenate([arrays.boxes + offsets[i] for i, arrays in enumerate(per_crop)], axis=0),
+            scores=np.concatenate([arrays.scores for arrays in per_crop]),
+            classes=np.concatenate([arrays.classes for arrays in per_crop]),
+        )
+        order = np.argsort(-merged.scores, kind="stable")
+        return DetectionArrays(merged.boxes[order], merged.scores[order], merged.classes[order]).to_list()
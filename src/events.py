@@ -0,0 +1,171 @@
+"""Máquina de estados Approach/Pick/Leave sobre arrays tracks × ROIs.
+
+El estado de cada par (track, ROI) abierto vive en arrays NumPy indexados por
+una fila por track con alguna interacción abierta (las filas se reciclan cuando
+el track sale de todos los ROIs o lo retira el tracker). Cada frame se avanza
+con operaciones sobre la matriz (N tracks, R ROIs) y solo se recorre en Python
+la lista de eventos emitidos.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (track_id, roi_id, evento, inicio, fin)
+Event = Tuple[int, str, str, float, float]
+
+
+class RoiEventEngine:
+    def __init__(self, roi_ids: Sequence[str], approach_seconds: float, pick_area_delta: float, capacity: int = 64):
+        self.roi_ids = list(roi_ids)
+        self.approach_seconds = approach_seconds
+        self.pick_area_delta = pick_area_delta
+        rois = len(self.roi_ids)
+        capacity = max(capacity, 1)
+        self.inside = np.zeros((capacity, rois), dtype=bool)
+        self.enter_time = np.full((capacity, rois), np.nan)
+        self.approach_start = np.full((capacity, rois), np.nan)
+        self.pick_time = np.full((capacity, rois), np.nan)
+        self.opened = np.zeros(capacity, dtype=np.int64)  # orden en que el track abrió su primera interacción
+        self._rows: Dict[int, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        """Tracks con alguna interacción abierta."""
+        return len(self._rows)
+
+    def _grow(self) -> None:
+        old = self.inside.shape[0]
+        pad = ((0, old), (0, 0))
+        self.inside = np.pad(self.inside, pad)
+        self.enter_time = np.pad(self.enter_time, pad, constant_values=np.nan)
+        self.approach_start = np.pad(self.approach_start, pad, constant_values=np.nan)
+        self.pick_time = np.pad(self.pick_time, pad, constant_values=np.nan)
+        self.opened = np.pad(self.opened, (0, old))
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+
+    def _release(self, track_id: int) -> None:
+        row = self._rows.pop(track_id)
+        self.inside[row] = False
+        self.enter_time[row] = np.nan
+        self.approach_start[row] = np.nan
+        self.pick_time[row] = np.nan
+        self._free.append(row)
+
+    def _close(
+        self,
+        track_ids: List[int],
+        rois: List[int],
+        approach: List[float],
+        pick: List[float],
+        leave: float,
+        events: List[Event],
+    ) -> None:
+        # Listas ya convertidas con tolist(): NaN es el único valor distinto de sí mismo.
+        for track_id, r, approach_start, pick_time in zip(track_ids, rois, approach, pick):
+            roi_id = self.roi_ids[r]
+            if approach_start == approach_start:
+                events.append((track_id, roi_id, "Approach", approach_start, leave))
+            if pick_time == pick_time:
+                events.append((track_id, roi_id, "Pick", pick_time, leave))
+            events.append((track_id, roi_id, "Leave", leave, leave))
+
+    def step(
+        self,
+        track_ids: Sequence[int],
+        inside: np.ndarray,
+        area_changed: np.ndarray,
+        wrist_hits: Optional[np.ndarray],
+        t: float,
+    ) -> List[Event]:
+        """Avanza un frame.
+
+        ``inside`` (N, R): centro de cada track dentro de cada ROI.
+        ``area_changed`` (N,): el área de la caja cambió al menos ``pick_area_delta``.
+        ``wrist_hits`` (R,) o (N, R): alguna muñeca (de cualquiera o de cada track)
+        dentro de cada ROI; ``None`` sin pose.
+        Los tracks abiertos que no aparecen en ``track_ids`` se dan por retirados.
+        """
+        events: List[Event] = []
+        n = len(track_ids)
+        rows = np.array([self._rows.get(tid, -1) for tid in track_ids], dtype=np.int64)
+        known = rows >= 0
+        shape = (n, len(self.roi_ids))
+        was_inside = np.zeros(shape, dtype=bool)
+        enter = np.full(shape, np.nan)
+        approach = np.full(shape, np.nan)
+        pick = np.full(shape, np.nan)
+        was_inside[known] = self.inside[rows[known]]
+        enter[known] = self.enter_time[rows[known]]
+        approach[known] = self.approach_start[rows[known]]
+        pick[known] = self.pick_time[rows[known]]
+
+        # Salidas: se emiten en orden (track, ROI) con los tiempos previos y se limpian.
+        left_i, left_r = np.nonzero(was_inside & ~inside)
+        if left_i.size:
+            ids = [track_ids[i] for i in left_i.tolist()]
+            approach_left, pick_left = approach[left_i, left_r].tolist(), pick[left_i, left_r].tolist()
+            self._close(ids, left_r.tolist(), approach_left, pick_left, t, events)
+        enter[~inside] = np.nan
+        approach[~inside] = np.nan
+        pick[~inside] = np.nan
+
+        entered = inside & ~was_inside
+        enter[entered] = t
+        approach = np.where(inside & np.isnan(approach) & (t - enter >= self.approach_seconds), enter, approach)
+        picked = np.asarray(area_changed, dtype=bool)[:, None]
+        if wrist_hits is not None:
+            wrist_hits = np.asarray(wrist_hits, dtype=bool)
+            picked = picked | (wrist_hits if wrist_hits.ndim == 2 else wrist_hits[None, :])
+        pick = np.where(inside & np.isnan(pick) & picked, t, pick)
+
+        # Escritura de vuelta: filas nuevas para tracks que abren interacción, liberación de los que cierran.
+        any_inside = inside.any(axis=1)
+        for i in np.nonzero(any_inside & ~known)[0]:
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            self._rows[int(track_ids[i])] = row
+            self.opened[row] = self._sequence
+            self._sequence += 1
+            rows[i] = row
+        for i in np.nonzero(~any_inside & known)[0]:
+            self._release(int(track_ids[i]))
+        write = any_inside
+        self.inside[rows[write]] = inside[write]
+        self.enter_time[rows[write]] = enter[write]
+        self.approach_start[rows[write]] = approach[write]
+        self.pick_time[rows[write]] = pick[write]
+
+        # Tracks retirados por el tracker: cierre de todo lo abierto, en el orden en que se abrió.
+        alive = set(track_ids)
+        retired = [tid for tid in self._rows if tid not in alive]
+        for tid in sorted(retired, key=lambda tid: self.opened[self._rows[tid]]):
+            row = self._rows[tid]
+            rois = self._open_rois(row)
+            approach_start, pick_time = self.approach_start[row, rois].tolist(), self.pick_time[row, rois].tolist()
+            self._close([tid] * len(rois), rois, approach_start, pick_time, t, events)
+            self._release(tid)
+        return events
+
+    def _open_rois(self, row: int) -> List[int]:
+        # Orden de entrada (tiempo de entrada y, a igual tiempo, orden de ROI).
+        open_rois = np.nonzero(self.inside[row])[0]
+        return open_rois[np.argsort(self.enter_time[row, open_rois], kind="stable")].tolist()
+
+    def states(self, track_id: int) -> List[Tuple[str, str]]:
+        """(roi_id, estado) de las interacciones abiertas del track: ``In``, ``Approach`` o ``Pick``."""
+        row = self._rows.get(track_id)
+        if row is None:
+            return []
+        result = []
+        for r in self._open_rois(row):
+            if not np.isnan(self.pick_time[row, r]):
+                result.append((self.roi_ids[r], "Pick"))
+            elif not np.isnan(self.approach_start[row, r]):
+                result.append((self.roi_ids[r], "Approach"))
+            else:
+                result.append((self.roi_ids[r], "In"))
+        return result
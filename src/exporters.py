@@ -2,21 +2,60 @@ from __future__ import annotations
 
 import csv
 import json
+import logging
+import queue
+import threading
+import time
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import IO, Any, Dict, Iterable, List, Optional
 
 
 @dataclass
 class ExportBuffer:
+    """Filas de tracks y eventos de una ejecución.
+
+    Con sinks configurados las filas se envían a ellos según llegan y no se
+    guardan en memoria; sin sinks se acumulan en ``rows``/``events``.
+    """
+
     rows: List[Dict[str, Any]] = None
     events: List[Dict[str, Any]] = None
+    row_sinks: List["StreamingSink"] = None
+    event_sinks: List["StreamingSink"] = None
 
     def __post_init__(self) -> None:
         if self.rows is None:
             self.rows = []
         if self.events is None:
             self.events = []
+        if self.row_sinks is None:
+            self.row_sinks = []
+        if self.event_sinks is None:
+            self.event_sinks = []
+
+    def add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if not self.row_sinks:
+            self.rows.extend(rows)
+        for sink in self.row_sinks:
+            sink.write_many(rows)
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        if not self.event_sinks:
+            self.events.append(event)
+        for sink in self.event_sinks:
+            sink.write_many([event])
+
+    def close(self) -> None:
+        errors = []
+        for sink in self.row_sinks + self.event_sinks:
+            try:
+                sink.close()
+            except Exception as exc:
+                errors.append(exc)
+        self.row_sinks, self.event_sinks = [], []
+        if errors:
+            raise errors[0]
 
 
 def write_json(path: Path, rows: List[Dict[str, Any]]) -> None:
@@ -35,3 +74,145 @@ def write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
         writer = csv.DictWriter(f, fieldnames=keys)
         writer.writeheader()
         writer.writerows(rows)
+
+
+_END = object()
+
+
+class StreamingSink:
+    """Escritor incremental en un hilo de fondo.
+
+    ``write_many`` solo encola la lista recibida (la cola es acotada, así que
+    un disco lento frena al productor en vez de acumular memoria). El hilo
+    agrupa filas y escribe un bloque cuando hay ``batch_rows`` pendientes o la
+    fila más antigua lleva ``flush_seconds`` esperando, y hace ``flush`` tras
+    cada bloque para que un fallo del proceso no pierda lo ya escrito. Los
+    errores de escritura se relanzan en el siguiente ``write_many`` o en ``close``.
+    """
+
+    def __init__(self, path: Path, batch_rows: int = 512, flush_seconds: float = 2.0, queue_size: int = 256):
+        self.path = path
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, queue_size))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._worker, name=f"export-{path.name}", daemon=True)
+        self._thread.start()
+
+    # Formato concreto de cada sink.
+    def _open(self) -> IO[str]:
+        return self.path.open("w", encoding="utf-8", newline="")
+
+    def _write_batch(self, f: IO[str], rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _finish(self, f: IO[str]) -> None:
+        pass
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Falló la exportación a {self.path}") from self._error
+        rows = list(rows)
+        if rows:
+            self._put(rows)
+
+    def _put(self, item: object) -> None:
+        # Espera con timeout para no quedar bloqueado si el hilo murió con la cola llena.
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self.write_many([row])
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._put(_END)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"Falló la exportación a {self.path}") from self._error
+
+    def _worker(self) -> None:
+        f = None
+        try:
+            f = self._open()
+            pending: List[Dict[str, Any]] = []
+            oldest = 0.0
+            while True:
+                timeout = max(0.0, oldest + self.flush_seconds - time.monotonic()) if pending else None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is _END:
+                    break
+                if item:
+                    if not pending:
+                        oldest = time.monotonic()
+                    pending.extend(item)
+                if pending and (len(pending) >= self.batch_rows or time.monotonic() - oldest >= self.flush_seconds):
+                    self._flush(f, pending)
+                    pending = []
+            if pending:
+                self._flush(f, pending)
+            self._finish(f)
+        except BaseException as exc:  # se propaga al productor
+            logging.exception("Error escribiendo %s; se descartan las filas siguientes.", self.path)
+            self._error = exc
+        finally:
+            if f is not None:
+                f.close()
+
+    def _flush(self, f: IO[str], rows: List[Dict[str, Any]]) -> None:
+        self._write_batch(f, rows)
+        f.flush()
+        self.rows_written += len(rows)
+
+
+class JsonLinesSink(StreamingSink):
+    """Un objeto JSON por línea: válido aunque el proceso se corte a mitad."""
+
+    def _write_batch(self, f: IO[str], rows: List[Dict[str, Any]]) -> None:
+        f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+
+class JsonArraySink(StreamingSink):
+    """Array JSON escrito por partes (mismo contenido que ``write_json``), para rutas ``.json``."""
+
+    def _open(self) -> IO[str]:
+        f = super()._open()
+        f.write("[")
+        return f
+
+    def _write_batch(self, f: IO[str], rows: List[Dict[str, Any]]) -> None:
+        sep = ",\n  " if self.rows_written else "\n  "
+        f.write(sep + ",\n  ".join(json.dumps(row, ensure_ascii=False) for row in rows))
+
+    def _finish(self, f: IO[str]) -> None:
+        f.write("\n]\n")
+
+
+class CsvSink(StreamingSink):
+    """CSV con la cabecera de la primera fila; sin filas queda un archivo vacío (como ``write_csv``)."""
+
+    _writer: Optional[csv.DictWriter] = None
+
+    def _write_batch(self, f: IO[str], rows: List[Dict[str, Any]]) -> None:
+        if self._writer is None:
+            self._writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+
+
+def json_sink(path: Path, batch_rows: int = 512, flush_seconds: float = 2.0) -> StreamingSink:
+    """``.jsonl`` → JSON Lines; cualquier otra extensión → array JSON."""
+    cls = JsonLinesSink if path.suffix.lower() == ".jsonl" else JsonArraySink
+    return cls(path, batch_rows=batch_rows, flush_seconds=flush_seconds)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from src.config import MotionConfig
+
+
+class MotionGate:
+    """Decide si un frame merece pasar por el detector.
+
+    Compara una versión reducida en grises del frame con la del último frame
+    detectado (no con el anterior), así los cambios lentos se acumulan hasta
+    superar el umbral. Con ``method="mog2"`` se usa un sustractor de fondo.
+    Cada ``max_skip`` frames seguidos sin movimiento se fuerza una detección.
+    """
+
+    def __init__(self, config: MotionConfig):
+        if config.method not in ("diff", "mog2"):
+            raise ValueError(f"Método de movimiento inválido: {config.method}")
+        self.config = config
+        self._reference: Optional[np.ndarray] = None
+        self._small: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+        self._diff: Optional[np.ndarray] = None
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if config.method == "mog2" else None
+        self._since_detection = 0
+        self.checked = 0
+        self.skipped = 0
+
+    def _downscale(self, image: np.ndarray) -> np.ndarray:
+        h, w = image.shape[:2]
+        width = min(self.config.width, w)
+        size = (width, max(1, int(round(h * width / w))))
+        if self._small is None or self._small.shape[:2] != (size[1], size[0]):
+            self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._diff = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._reference = None
+        cv2.resize(image, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._gray
+
+    def _changed_fraction(self, gray: np.ndarray) -> float:
+        if self._subtractor is not None:
+            mask = self._subtractor.apply(gray)
+            return float(np.count_nonzero(mask)) / mask.size
+        if self._reference is None:
+            return 1.0
+        cv2.absdiff(gray, self._reference, dst=self._diff)
+        return float(np.count_nonzero(self._diff > self.config.pixel_delta)) / self._diff.size
+
+    def should_detect(self, image: np.ndarray) -> bool:
+        self.checked += 1
+        gray = self._downscale(image)
+        moving = self._changed_fraction(gray) >= self.config.threshold
+        forced = self.config.max_skip > 0 and self._since_detection >= self.config.max_skip
+        if moving or forced or self._reference is None:
+            if self._reference is None:
+                self._reference = gray.copy()
+            else:
+                np.copyto(self._reference, gray)
+            self._since_detection = 0
+            return True
+        self._since_detection += 1
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.checked if self.checked else 0.0
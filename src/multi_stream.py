@@ -0,0 +1,141 @@
+"""Varias cámaras en un solo proceso con una única sesión ONNX compartida.
+
+Cada fuente tiene su propio ``Pipeline`` (tracker, estado de ROIs, escritor y
+exportadores) y un lector en hilo de fondo. En cada vuelta se toma el siguiente
+frame de cada fuente activa y todos se detectan juntos con
+``OnnxDetector.detect_batch``.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from src.config import AppConfig
+from src.pipeline import OnnxDetector, Pipeline
+from src.video_io import FrameData, iter_frames
+
+
+def stream_path(path: Optional[Path], stream_idx: int) -> Optional[Path]:
+    """``runs/out.csv`` → ``runs/out_1.csv`` para la fuente ``1``."""
+    if path is None:
+        return None
+    return path.with_name(f"{path.stem}_{stream_idx}{path.suffix}")
+
+
+def stream_config(config: AppConfig, source: str, stream_idx: int) -> AppConfig:
+    export = config.export
+    return replace(
+        config,
+        source=source,
+        sources=(),
+        output=stream_path(config.output, stream_idx),
+        export=replace(
+            export,
+            json_path=stream_path(export.json_path, stream_idx),
+            csv_path=stream_path(export.csv_path, stream_idx),
+            events_path=stream_path(export.events_path, stream_idx),
+        ),
+    )
+
+
+@dataclass
+class _Stream:
+    index: int
+    source: str
+    pipeline: Pipeline
+    frames: Iterator[FrameData]
+    processed: int = 0
+    busy_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+
+class MultiStreamPipeline:
+    def __init__(self, config: AppConfig):
+        if not config.sources:
+            raise ValueError("MultiStreamPipeline requiere al menos una fuente en 'sources'.")
+        self.config = config
+        self.detector = OnnxDetector(str(config.model_path), config.detector)
+        first = Pipeline(stream_config(config, config.sources[0], 0), detector=self.detector)
+        self.pose_estimator = first.pose_estimator
+        self.pipelines: List[Pipeline] = [first] + [
+            Pipeline(stream_config(config, source, i), detector=self.detector, pose_estimator=self.pose_estimator)
+            for i, source in enumerate(config.sources[1:], start=1)
+        ]
+
+    def _open_streams(self) -> List[_Stream]:
+        # Siempre con prefetch para que la decodificación de todas las fuentes avance en paralelo.
+        depth = max(self.config.video.prefetch, 2)
+        streams = []
+        for i, pipeline in enumerate(self.pipelines):
+            frames = iter_frames(
+                pipeline.config.source,
+                every_n=self.config.video.every_n_frames,
+                max_frames=self.config.max_frames,
+                prefetch=depth,
+                drop_policy=self.config.video.prefetch_drop,
+                seek_stride=self.config.video.seek_stride,
+            )
+            streams.append(_Stream(index=i, source=pipeline.config.source, pipeline=pipeline, frames=frames))
+        return streams
+
+    def run(self) -> None:
+        logging.info("Inicio multi-fuente | fuentes=%s | modo=%s", len(self.pipelines), self.config.mode)
+        start_time = time.perf_counter()
+        streams = self._open_streams()
+        active = list(streams)
+        try:
+            while active:
+                batch = []
+                for stream in list(active):
+                    frame_data = next(stream.frames, None)
+                    if frame_data is None:
+                        stream.finished = time.perf_counter()
+                        active.remove(stream)
+                        continue
+                    batch.append((stream, frame_data))
+                if batch:
+                    self._process_round(batch)
+        finally:
+            for stream in streams:
+                stream.frames.close()
+                stream.pipeline.close()
+
+        total = time.perf_counter() - start_time
+        processed = sum(stream.processed for stream in streams)
+        for stream in streams:
+            elapsed = (stream.finished or time.perf_counter()) - stream.started
+            logging.info(
+                "Fuente %s (%s) | frames=%s | fps≈%.2f | tiempo propio=%.2fs",
+                stream.index,
+                stream.source,
+                stream.processed,
+                stream.processed / elapsed if elapsed > 0 else 0.0,
+                stream.busy_seconds,
+            )
+        logging.info(
+            "Fin multi-fuente | frames=%s | tiempo=%.2fs | fps total≈%.2f",
+            processed,
+            total,
+            processed / total if total > 0 else 0.0,
+        )
+
+    def _process_round(self, batch) -> None:
+        t0 = time.perf_counter()
+        # Solo entran al batch los frames que el gate de movimiento de su fuente deja pasar.
+        needs = [stream.pipeline.needs_detection(frame_data) for stream, frame_data in batch]
+        selected = [(stream, frame_data) for (stream, frame_data), need in zip(batch, needs) if need]
+        if any(stream.pipeline.crop_mode for stream, _ in selected) or len(selected) <= 1:
+            detected = iter([stream.pipeline.detect(frame_data.image) for stream, frame_data in selected])
+        else:
+            detected = iter(self.detector.detect_batch([frame_data.image for _, frame_data in selected]))
+        detections_per_frame = [next(detected) if need else None for need in needs]
+        det_seconds = (time.perf_counter() - t0) / len(batch)
+        for (stream, frame_data), detections in zip(batch, detections_per_frame):
+            t1 = time.perf_counter()
+            stream.pipeline._process_frame(frame_data, detections, det_seconds * 1e3)
+            stream.busy_seconds += det_seconds + (time.perf_counter() - t1)
+            stream.processed += 1
@@ -2,35 +2,55 @@ from __future__ import annotations
 
 import logging
 import time
-from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 import cv2
 import numpy as np
-from typing import Dict, List
-
-import cv2
 
 from src.config import AppConfig
 from src.detector_onnx import OnnxDetector
-from src.exporters import ExportBuffer, write_csv, write_json
-from src.tracker import IoUTracker
-from src.rois import ROI, load_rois
+from src.events import RoiEventEngine
+from src.exporters import CsvSink, ExportBuffer, json_sink
+from src.tracker import Track, build_tracker
+from src.rois import ROI, ROIMask, crop_regions, load_rois
+from src.motion import MotionGate
 from src.pose import OnnxPoseEstimator, PoseResult
-from src.video_io import VideoWriter, iter_frames
+from src.video_io import FrameData, VideoWriter, iter_frames
 
 
 class Pipeline:
-    def __init__(self, config: AppConfig):
+    def __init__(
+        self,
+        config: AppConfig,
+        load_models: bool = True,
+        detector: OnnxDetector | None = None,
+        pose_estimator: OnnxPoseEstimator | None = None,
+    ):
         self.config = config
-        self.detector = OnnxDetector(str(config.model_path), config.detector)
-        self.tracker = IoUTracker(config.tracker)
-        self.export_buffer = ExportBuffer()
+        # load_models=False sirve para re-exportar tracks ya calculados (p.ej. modo por segmentos);
+        # detector/pose_estimator permiten compartir sesiones ONNX entre pipelines.
+        if detector is None and load_models:
+            detector = OnnxDetector(str(config.model_path), config.detector)
+        self.detector = detector
+        self.tracker = build_tracker(config.tracker)
+        self._last_update_index: int | None = None
+        # Última fila exportada de cada track: (frame, time_ms, bbox), para interpolar frames saltados.
+        self._last_rows: Dict[int, Tuple[int, float | None, Tuple[float, float, float, float]]] = {}
+        self.export_buffer = self._init_exports()
         self.writer = None
         self._tracking_enabled = True
         self.rois: List[ROI] = self._load_rois()
-        self._interactions: Dict[Tuple[int, str], Dict[str, float | bool]] = {}
-        self.pose_estimator: OnnxPoseEstimator | None = self._init_pose()
+        self.roi_mask: ROIMask | None = ROIMask(self.rois) if self.rois else None
+        self.interactions = RoiEventEngine(
+            [roi.roi_id for roi in self.rois], self.config.approach_seconds, self.config.pick_area_delta
+        )
+        if pose_estimator is None and load_models:
+            pose_estimator = self._init_pose()
+        self.pose_estimator: OnnxPoseEstimator | None = pose_estimator
+        self._last_pose: PoseResult | None = None
+        self._crop_regions: List[Tuple[int, int, int, int]] | None = None
+        self._crop_shape: Tuple[int, int] | None = None
+        self.motion_gate: MotionGate | None = MotionGate(config.motion) if config.motion.enabled else None
 
     def _init_writer(self, frame_shape, fps: float | None) -> None:
         if not self.config.output:
@@ -52,20 +72,6 @@ class Pipeline:
             cv2.putText(
                 frame,
                 label_text,
-    def _init_writer(self, frame_shape) -> None:
-        if not self.config.output:
-            return
-        height, width = frame_shape[:2]
-        fps = 30.0  # fallback si no se conoce la fuente
-        self.writer = VideoWriter(self.config.output, fps=fps, frame_size=(width, height))
-
-    def _draw(self, frame, tracks) -> None:
-        for track in tracks:
-            x1, y1, x2, y2 = map(int, track.bbox)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 200, 0), 2)
-            cv2.putText(
-                frame,
-                f"ID {track.track_id} {track.score:.2f}",
                 (x1, max(0, y1 - 5)),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.5,
@@ -75,6 +81,10 @@ class Pipeline:
             )
 
     def _export_frame(self, frame_idx: int, timestamp_ms, tracks) -> None:
+        interpolate = self.config.tracker.interpolate
+        if interpolate:
+            self._export_interpolated(frame_idx, timestamp_ms, tracks)
+        records = []
         for track in tracks:
             record: Dict[str, object] = {
                 "frame": frame_idx,
@@ -84,102 +94,196 @@ class Pipeline:
                 "cls": track.cls,
                 "bbox": track.bbox,
             }
-            self.export_buffer.rows.append(record)
+            if interpolate:
+                record["interpolated"] = False
+            records.append(record)
+        self.export_buffer.add_rows(records)
+
+    def _export_interpolated(self, frame_idx: int, timestamp_ms, tracks) -> None:
+        """Filas lineales para los frames saltados entre dos detecciones consecutivas del mismo track."""
+        rows = []
+        last_rows = {}
+        for track in tracks:
+            last_rows[track.track_id] = (frame_idx, timestamp_ms, track.bbox)
+            previous = self._last_rows.get(track.track_id)
+            # Solo tracks confirmados por detección en este frame; los que van en predicción no se rellenan.
+            if previous is None or track.misses > 0 or frame_idx - previous[0] <= 1:
+                continue
+            prev_idx, prev_ms, prev_box = previous
+            span = frame_idx - prev_idx
+            for idx in range(prev_idx + 1, frame_idx):
+                alpha = (idx - prev_idx) / span
+                rows.append(
+                    {
+                        "frame": idx,
+                        "time_ms": (
+                            prev_ms + alpha * (timestamp_ms - prev_ms)
+                            if prev_ms is not None and timestamp_ms is not None
+                            else None
+                        ),
+                        "track_id": track.track_id,
+                        "score": track.score,
+                        "cls": track.cls,
+                        "bbox": tuple(p + alpha * (c - p) for p, c in zip(prev_box, track.bbox)),
+                        "interpolated": True,
+                    }
+                )
+        self._last_rows = last_rows
+        rows.sort(key=lambda r: r["frame"])
+        self.export_buffer.add_rows(rows)
 
     def run(self) -> None:
         logging.info("Inicio de pipeline | modo=%s | dry_run=%s", self.config.mode, self.config.dry_run)
         start_time = time.perf_counter()
         processed = 0
-        last_pose: PoseResult | None = None
+        batch_size = max(1, self.config.detector.batch_size)
+        pending: List[FrameData] = []
         for frame_data in iter_frames(
             self.config.source,
             every_n=self.config.video.every_n_frames,
             max_frames=self.config.max_frames,
+            prefetch=self.config.video.prefetch,
+            drop_policy=self.config.video.prefetch_drop,
+            seek_stride=self.config.video.seek_stride,
         ):
-            if self.writer is None and self.config.output:
-                self._init_writer(frame_data.image.shape, frame_data.fps)
+            if batch_size == 1:
+                t0 = time.perf_counter()
+                detections = self.detect(frame_data.image) if self.needs_detection(frame_data) else None
+                self._process_frame(frame_data, detections, (time.perf_counter() - t0) * 1e3)
+                processed += 1
+                continue
+            pending.append(frame_data)
+            if len(pending) >= batch_size:
+                processed += self._process_batch(pending)
+                pending = []
+        if pending:
+            processed += self._process_batch(pending)
 
-            frame_time = self._frame_time(frame_data)
-            t0 = time.perf_counter()
-            detections = self.detector(frame_data.image)
-            t1 = time.perf_counter()
-            if self.pose_estimator:
-                try:
-                    last_pose = self.pose_estimator(frame_data.image)
-                except Exception:
-                    logging.warning("Estimación de pose falló; desactivando pose.")
-                    self.pose_estimator = None
-            t1b = time.perf_counter()
-            if self._tracking_enabled:
-                try:
-                    tracks = self.tracker.update(detections)
-                except Exception:
-                    logging.exception("Fallo del tracker; continuando sin tracking.")
-                    self._tracking_enabled = False
-                    tracks = []
-            else:
-                tracks = []
-            t2 = time.perf_counter()
-            self._draw(frame_data.image, tracks)
-            t3 = time.perf_counter()
-            self._export_frame(frame_data.index, frame_data.timestamp_ms, tracks)
-            t4 = time.perf_counter()
-            if self.writer:
-                try:
-                    self.writer.write(frame_data.image)
-                except Exception:
-                    logging.exception("Error al escribir frame en video de salida; se desactiva escritura.")
-                    self.writer = None
-            processed += 1
-            self._update_interactions(tracks, frame_time, last_pose)
-            logging.info(
-                "Frame %s | det=%.2f ms | pose=%.2f ms | track=%.2f ms | draw=%.2f ms | export=%.2f ms",
-                frame_data.index,
-                (t1 - t0) * 1e3,
-                (t1b - t1) * 1e3,
-                (t2 - t1b) * 1e3,
-                (t3 - t2) * 1e3,
-                (t4 - t3) * 1e3,
-            )
-            self._update_interactions(tracks, frame_time)
+        self.close()
+        total = time.perf_counter() - start_time
+        fps = processed / total if total > 0 else 0
+        logging.info("Fin de pipeline | frames=%s | tiempo=%.2fs | fps≈%.2f", processed, total, fps)
+        if self.motion_gate:
             logging.info(
-                "Frame %s | det=%.2f ms | track=%.2f ms | draw=%.2f ms | export=%.2f ms",
-                frame_data.index,
-                (t1 - t0) * 1e3,
-                (t2 - t1) * 1e3,
-                (t3 - t2) * 1e3,
-                (t4 - t3) * 1e3,
+                "Gate de movimiento | detector omitido en %s/%s frames (%.1f%%)",
+                self.motion_gate.skipped,
+                self.motion_gate.checked,
+                self.motion_gate.skip_ratio * 100,
             )
-                self._init_writer(frame_data.image.shape)
 
-            detections = self.detector(frame_data.image)
-            tracks = self.tracker.update(detections)
-            self._draw(frame_data.image, tracks)
-            self._export_frame(frame_data.index, frame_data.timestamp_ms, tracks)
-            if self.writer:
-                self.writer.write(frame_data.image)
+    @property
+    def crop_mode(self) -> bool:
+        return self.config.roi_crop and bool(self.rois)
+
+    def detect(self, image):
+        if not self.crop_mode:
+            return self.detector(image)
+        shape = image.shape[:2]
+        if self._crop_shape != shape:
+            self._crop_regions = crop_regions(self.rois, shape, self.config.roi_crop_margin)
+            self._crop_shape = shape
+            logging.info("Inferencia por recortes de ROIs | regiones=%s", self._crop_regions)
+        return self.detector.detect_regions(image, self._crop_regions)
 
+    def needs_detection(self, frame_data: FrameData) -> bool:
+        return self.motion_gate is None or self.motion_gate.should_detect(frame_data.image)
+
+    def close(self) -> None:
         if self.writer:
             self.writer.close()
+            self.writer = None
         self._flush_exports()
-        total = time.perf_counter() - start_time
-        fps = processed / total if total > 0 else 0
-        logging.info("Fin de pipeline | frames=%s | tiempo=%.2fs | fps≈%.2f", processed, total, fps)
 
-    def _flush_exports(self) -> None:
-        if self.config.export.json_path:
-            self._ensure_parent(self.config.export.json_path)
-            write_json(self.config.export.json_path, self.export_buffer.rows)
-        if self.config.export.csv_path:
-            self._ensure_parent(self.config.export.csv_path)
-            write_csv(self.config.export.csv_path, self.export_buffer.rows)
-        if self.config.export.events_path:
-            self._ensure_parent(self.config.export.events_path)
-            write_csv(self.config.export.events_path, self.export_buffer.events)
+    def _process_batch(self, batch: List[FrameData]) -> int:
+        t0 = time.perf_counter()
+        to_detect = [f for f in batch if self.needs_detection(f)]
+        if self.crop_mode:
+            detected = iter([self.detect(f.image) for f in to_detect])
+        else:
+            detected = iter(self.detector.detect_batch([f.image for f in to_detect]) if to_detect else [])
+        det_ms = (time.perf_counter() - t0) * 1e3 / len(batch)
+        # Los frames se procesan en orden para que tracking/eventos vean la secuencia original;
+        # los descartados por el gate de movimiento llegan sin detecciones (None).
+        detect_ids = {id(f) for f in to_detect}
+        for frame_data in batch:
+            detections = next(detected) if id(frame_data) in detect_ids else None
+            self._process_frame(frame_data, detections, det_ms)
+        return len(batch)
+
+    def _process_frame(self, frame_data: FrameData, detections, det_ms: float) -> None:
+        """Procesa un frame ya detectado; ``detections=None`` deja que el tracker siga sin actualizar."""
+        if self.writer is None and self.config.output:
+            self._init_writer(frame_data.image.shape, frame_data.fps)
+
+        frame_time = self._frame_time(frame_data)
+        t1 = time.perf_counter()
+        if self._tracking_enabled:
+            try:
+                if detections is not None:
+                    gap = frame_data.index - self._last_update_index if self._last_update_index is not None else 1
+                    tracks = self.tracker.update(detections, frame_gap=max(gap, 1))
+                    self._last_update_index = frame_data.index
+                else:
+                    tracks = self.tracker.coast()
+            except Exception:
+                logging.exception("Fallo del tracker; continuando sin tracking.")
+                self._tracking_enabled = False
+                tracks = []
+        else:
+            tracks = []
+        t1b = time.perf_counter()
+        # La pose va antes de dibujar para que los recortes no lleven las anotaciones.
+        if self.pose_estimator and detections is not None:
+            try:
+                if self.config.pose.top_down:
+                    self._estimate_track_poses(frame_data.image, tracks)
+                else:
+                    self._last_pose = self.pose_estimator(frame_data.image)
+            except Exception:
+                logging.warning("Estimación de pose falló; desactivando pose.")
+                self.pose_estimator = None
+        t2 = time.perf_counter()
+        self._draw(frame_data.image, tracks)
+        t3 = time.perf_counter()
+        self._export_frame(frame_data.index, frame_data.timestamp_ms, tracks)
+        t4 = time.perf_counter()
+        if self.writer:
+            try:
+                self.writer.write(frame_data.image)
+            except Exception:
+                logging.exception("Error al escribir frame en video de salida; se desactiva escritura.")
+                self.writer = None
+        self._update_interactions(tracks, frame_time, self._last_pose)
+        logging.info(
+            "Frame %s | det=%.2f ms | pose=%.2f ms | track=%.2f ms | draw=%.2f ms | export=%.2f ms",
+            frame_data.index,
+            det_ms,
+            (t2 - t1b) * 1e3,
+            (t1b - t1) * 1e3,
+            (t3 - t2) * 1e3,
+            (t4 - t3) * 1e3,
+        )
+
+    def replay(self, frames: Iterable[Tuple[FrameData, List[Track]]]) -> None:
+        """Exporta e infiere eventos a partir de tracks ya calculados, frame a frame y en orden."""
+        for frame_data, tracks in frames:
+            self._export_frame(frame_data.index, frame_data.timestamp_ms, tracks)
+            self._update_interactions(tracks, self._frame_time(frame_data), None)
+        self._flush_exports()
 
-    @staticmethod
-    def _ensure_parent(path: Path) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
+    def _init_exports(self) -> ExportBuffer:
+        export = self.config.export
+        options = {"batch_rows": export.batch_rows, "flush_seconds": export.flush_seconds}
+        row_sinks = []
+        if export.json_path:
+            row_sinks.append(json_sink(export.json_path, **options))
+        if export.csv_path:
+            row_sinks.append(CsvSink(export.csv_path, **options))
+        event_sinks = [CsvSink(export.events_path, **options)] if export.events_path else []
+        return ExportBuffer(row_sinks=row_sinks, event_sinks=event_sinks)
+
+    def _flush_exports(self) -> None:
+        self.export_buffer.close()
 
     def _load_rois(self) -> List[ROI]:
         if not self.config.rois_path:
@@ -197,60 +301,35 @@ class Pipeline:
         return frame_data.index / fps
 
     def _update_interactions(self, tracks, t: float, pose: PoseResult | None) -> None:
-    def _update_interactions(self, tracks, t: float) -> None:
         if not self.rois:
             return
-        for track in tracks:
-            cx = (track.bbox[0] + track.bbox[2]) / 2
-            cy = (track.bbox[1] + track.bbox[3]) / 2
-            area = max((track.bbox[2] - track.bbox[0]) * (track.bbox[3] - track.bbox[1]), 1e-6)
-            prev_area = None
-            if track.history:
-                hbox = track.history[-1]
-                prev_area = max((hbox[2] - hbox[0]) * (hbox[3] - hbox[1]), 1e-6)
-            for roi in self.rois:
-                inside = roi.contains(cx, cy)
-                key = (track.track_id, roi.roi_id)
-                state = self._interactions.get(
-                    key,
-                    {"inside": False, "enter_time": None, "approach_start": None, "pick_time": None},
-                )
-                if inside:
-                    if not state["inside"]:
-                        state = {
-                            "inside": True,
-                            "enter_time": t,
-                            "approach_start": None,
-                            "pick_time": None,
-                        }
-                    if state["enter_time"] is not None and state["approach_start"] is None and t - state["enter_time"] >= self.config.approach_seconds:
-                        state["approach_start"] = state["enter_time"]
-                    if state["pick_time"] is None:
-                        pick_detected = False
-                        if pose:
-                            pick_detected = self._wrist_in_roi(pose, roi)
-                        if not pick_detected and prev_area:
-                            delta = abs(area - prev_area) / prev_area
-                            pick_detected = delta >= self.config.pick_area_delta and state["enter_time"] is not None
-                        if pick_detected:
-                    if state["pick_time"] is None and prev_area:
-                        delta = abs(area - prev_area) / prev_area
-                        if delta >= self.config.pick_area_delta and state["enter_time"] is not None:
-                            state["pick_time"] = t
-                else:
-                    if state["inside"]:
-                        leave_time = t
-                        if state["approach_start"] is not None:
-                            self._record_event(track.track_id, roi.roi_id, "Approach", state["approach_start"], leave_time)
-                        if state["pick_time"] is not None:
-                            self._record_event(track.track_id, roi.roi_id, "Pick", state["pick_time"], leave_time)
-                        self._record_event(track.track_id, roi.roi_id, "Leave", leave_time, leave_time)
-                    state = {"inside": False, "enter_time": None, "approach_start": None, "pick_time": None}
-                self._interactions[key] = state
+        if tracks:
+            # Pertenencia de todos los centros (y muñecas) a todos los ROIs en una sola consulta al raster.
+            boxes = np.array([track.bbox for track in tracks], dtype=np.float64)
+            inside = self.roi_mask.lookup((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2)
+            area = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1e-6)
+            prev = np.array([track.history[-1] if track.history else track.bbox for track in tracks], dtype=np.float64)
+            prev_area = np.maximum((prev[:, 2] - prev[:, 0]) * (prev[:, 3] - prev[:, 1]), 1e-6)
+            has_prev = np.array([bool(track.history) for track in tracks])
+            area_changed = has_prev & (np.abs(area - prev_area) / prev_area >= self.config.pick_area_delta)
+        else:
+            inside = np.zeros((0, len(self.rois)), dtype=bool)
+            area_changed = np.zeros(0, dtype=bool)
+        if pose is not None:
+            wrist_hits = self._wrists_in_rois(pose)
+        elif any(track.pose is not None for track in tracks):
+            # Pose top-down: cada track solo puede hacer Pick con sus propias muñecas.
+            no_pose = np.zeros(len(self.rois), dtype=bool)
+            wrist_hits = np.stack([self._wrists_in_rois(t.pose) if t.pose is not None else no_pose for t in tracks])
+        else:
+            wrist_hits = None
+        events = self.interactions.step([track.track_id for track in tracks], inside, area_changed, wrist_hits, t)
+        for track_id, roi_id, event, start, end in events:
+            self._record_event(track_id, roi_id, event, start, end)
 
     def _record_event(self, track_id: int, roi_id: str, event: str, start: float, end: float) -> None:
         duration = max(0.0, end - start)
-        self.export_buffer.events.append(
+        self.export_buffer.add_event(
             {
                 "track_id": track_id,
                 "roi_id": roi_id,
@@ -263,21 +342,14 @@ class Pipeline:
 
     def _track_labels(self, track_id: int) -> List[str]:
         labels = [f"ID {track_id}"]
-        for (tid, roi_id), state in self._interactions.items():
-            if tid != track_id:
-                continue
-            if state.get("inside"):
-                if state.get("pick_time") is not None:
-                    labels.append(f"Pick@{roi_id}")
-                elif state.get("approach_start") is not None:
-                    labels.append(f"Approach@{roi_id}")
-                else:
-                    labels.append(f"In@{roi_id}")
+        labels.extend(f"{state}@{roi_id}" for roi_id, state in self.interactions.states(track_id))
         return labels
 
     def _init_pose(self) -> OnnxPoseEstimator | None:
         if not self.config.pose.enabled:
             return None
+        if self.config.pose.top_down and not self.rois:
+            logging.warning("La pose top-down solo se calcula para tracks dentro de ROIs; sin --rois no se usará.")
         try:
             model_path = (
                 str(self.config.pose.model_path)
@@ -289,10 +361,25 @@ class Pipeline:
             logging.exception("No se pudo inicializar el modelo de pose; continuando sin pose.")
             return None
 
-    def _wrist_in_roi(self, pose: PoseResult, roi: ROI) -> bool:
-        for x, y, score in pose.wrists():
-            if score < self.config.pose.conf:
-                continue
-            if roi.contains(x, y):
-                return True
-        return False
+    def _estimate_track_poses(self, image, tracks: List[Track]) -> None:
+        """Pose solo de los tracks cuyo centro está en algún ROI, en un único batch de recortes."""
+        for track in tracks:
+            track.pose = None
+        if not self.rois or not tracks:
+            return
+        boxes = np.array([track.bbox for track in tracks], dtype=np.float64)
+        inside = self.roi_mask.lookup((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2).any(axis=1)
+        scheduled = [track for track, flag in zip(tracks, inside.tolist()) if flag]
+        if not scheduled:
+            return
+        poses = self.pose_estimator.estimate_crops(image, [track.bbox for track in scheduled])
+        for track, pose in zip(scheduled, poses):
+            track.pose = pose
+
+    def _wrists_in_rois(self, pose: PoseResult) -> np.ndarray:
+        """(len(rois),) booleano: alguna muñeca con score suficiente cae en cada ROI."""
+        wrists = [(x, y) for x, y, score in pose.wrists() if score >= self.config.pose.conf]
+        if not wrists:
+            return np.zeros(len(self.rois), dtype=bool)
+        xs, ys = zip(*wrists)
+        return self.roi_mask.lookup(xs, ys).any(axis=0)
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Sequence, Tuple
+from typing import List, Optional, Sequence, Tuple
 
-import cv2
 import numpy as np
-import onnxruntime as ort
 
 from src.config import PoseConfig
+from src.detector_onnx import LetterboxPreprocessor, create_session, fixed_batch_size
 
 
 @dataclass
@@ -23,39 +22,69 @@ class PoseResult:
 class OnnxPoseEstimator:
     def __init__(self, model_path: str, config: PoseConfig):
         self.config = config
-        self.session = ort.InferenceSession(
-            model_path,
-            providers=["CPUExecutionProvider"],
-            sess_options=ort.SessionOptions(),
-        )
+        self.session = create_session(model_path, config.session)
+        self.fixed_batch = fixed_batch_size(self.session)
+        self.preprocessor = LetterboxPreprocessor(config.imgsz, max_batch=max(1, config.max_batch))
         self.input_name = self.session.get_inputs()[0].name
         self.output_names = [o.name for o in self.session.get_outputs()]
 
     def preprocess(self, image: "np.ndarray") -> Tuple["np.ndarray", float, Tuple[int, int]]:
-        h, w = image.shape[:2]
-        size = self.config.imgsz
-        scale = min(size / h, size / w)
-        nh, nw = int(round(h * scale)), int(round(w * scale))
-        resized = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
-        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
-        top, left = (size - nh) // 2, (size - nw) // 2
-        canvas[top : top + nh, left : left + nw] = resized
-        img = canvas[:, :, ::-1].astype(np.float32) / 255.0
-        img = np.transpose(img, (2, 0, 1))[None, ...]
-        return img, scale, (left, top)
+        return self.preprocessor(image)
+
+    @staticmethod
+    def _to_result(
+        preds: "np.ndarray", scale: float, pad: Tuple[int, int], offset: Tuple[int, int] = (0, 0)
+    ) -> PoseResult:
+        xy = (preds[:, :2] - np.array(pad, dtype=np.float64)) / scale + np.array(offset, dtype=np.float64)
+        keypoints = np.concatenate([xy, preds[:, 2:3].astype(np.float64)], axis=1)
+        return PoseResult(keypoints=[tuple(kp) for kp in keypoints.tolist()])
 
     def postprocess(self, outputs: Sequence["np.ndarray"], scale: float, pad: Tuple[int, int]) -> PoseResult:
         preds = outputs[0]  # (1, K, 3) expected
         if preds.ndim == 3:
             preds = preds[0]
-        keypoints: List[Tuple[float, float, float]] = []
-        for x, y, score in preds:
-            x = (x - pad[0]) / scale
-            y = (y - pad[1]) / scale
-            keypoints.append((float(x), float(y), float(score)))
-        return PoseResult(keypoints=keypoints)
+        return self._to_result(preds, scale, pad)
 
     def __call__(self, image: "np.ndarray") -> PoseResult:
         blob, scale, pad = self.preprocess(image)
         outputs = self.session.run(self.output_names, {self.input_name: blob})
         return self.postprocess(outputs, scale, pad)
+
+    def crop_regions(
+        self, boxes: Sequence[Tuple[float, float, float, float]], frame_shape: Tuple[int, int]
+    ) -> List[Tuple[int, int, int, int]]:
+        """Recortes enteros de las cajas ampliadas ``crop_margin`` por lado y recortadas al frame."""
+        h, w = frame_shape[:2]
+        regions = []
+        for x1, y1, x2, y2 in boxes:
+            mx, my = (x2 - x1) * self.config.crop_margin, (y2 - y1) * self.config.crop_margin
+            regions.append(
+                (
+                    int(max(0.0, x1 - mx)),
+                    int(max(0.0, y1 - my)),
+                    int(min(float(w), round(x2 + mx))),
+                    int(min(float(h), round(y2 + my))),
+                )
+            )
+        return regions
+
+    def estimate_crops(
+        self, image: "np.ndarray", boxes: Sequence[Tuple[float, float, float, float]]
+    ) -> List[Optional[PoseResult]]:
+        """Pose top-down: un esqueleto por caja, con todos los recortes en un ``session.run``.
+
+        Con batch fijo en el modelo se procesa en bloques de ese tamaño. Las cajas
+        que quedan vacías al recortarlas al frame devuelven ``None``.
+        """
+        regions = self.crop_regions(boxes, image.shape)
+        valid = [i for i, (x1, y1, x2, y2) in enumerate(regions) if x2 > x1 and y2 > y1]
+        results: List[Optional[PoseResult]] = [None] * len(regions)
+        chunk = self.fixed_batch or max(1, self.config.max_batch)
+        for start in range(0, len(valid), chunk):
+            group = valid[start : start + chunk]
+            crops = [image[regions[i][1] : regions[i][3], regions[i][0] : regions[i][2]] for i in group]
+            batch, metas = self.preprocessor.fill(crops, batch=chunk if self.fixed_batch else None)
+            preds = self.session.run(self.output_names, {self.input_name: batch})[0]
+            for slot, (i, (scale, pad)) in enumerate(zip(group, metas)):
+                results[i] = self._to_result(preds[slot], scale, pad, offset=regions[i][:2])
+        return results
@@ -3,7 +3,10 @@ from __future__ import annotations
 import json
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
 
 Point = Tuple[float, float]
 
@@ -34,6 +37,94 @@ class ROI:
         return [(int(x), int(y)) for x, y in self.points]
 
 
+def crop_regions(
+    rois: Sequence[ROI], frame_shape: Tuple[int, int], margin: float = 0.25
+) -> List[Tuple[int, int, int, int]]:
+    """Cajas de recorte (x1, y1, x2, y2) que cubren los ROIs, ampliadas y fusionadas si se solapan.
+
+    ``margin`` amplía cada caja en esa fracción de su ancho/alto por lado, para
+    que entre completa una persona cuyo centro está dentro del polígono.
+    """
+    h, w = frame_shape[:2]
+    boxes: List[List[float]] = []
+    for roi in rois:
+        xs = [x for x, _ in roi.points]
+        ys = [y for _, y in roi.points]
+        x1, y1, x2, y2 = min(xs), min(ys), max(xs), max(ys)
+        mx, my = (x2 - x1) * margin, (y2 - y1) * margin
+        boxes.append([max(0.0, x1 - mx), max(0.0, y1 - my), min(float(w), x2 + mx), min(float(h), y2 + my)])
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    regions = [(int(x1), int(y1), int(round(x2)), int(round(y2))) for x1, y1, x2, y2 in boxes]
+    return [r for r in regions if r[2] > r[0] and r[3] > r[1]]
+
+
+class ROIMask:
+    """Raster de etiquetas con la pertenencia de cada píxel a los ROIs.
+
+    Cada píxel guarda un índice a ``table`` (fila booleana de longitud
+    ``len(rois)``), una etiqueta por combinación distinta de ROIs, así los ROIs
+    solapados no necesitan un plano por ROI. La consulta de N puntos es un solo
+    gather: ``table[raster[y, x]]`` → (N, len(rois)). Sin ``frame_shape`` el
+    raster cubre desde el origen hasta el extremo de los ROIs; fuera de él no hay
+    pertenencia.
+    """
+
+    def __init__(self, rois: Sequence[ROI], frame_shape: Optional[Tuple[int, int]] = None):
+        self.roi_ids = [roi.roi_id for roi in rois]
+        if frame_shape is None:
+            xs = [x for roi in rois for x, _ in roi.points] or [0.0]
+            ys = [y for roi in rois for _, y in roi.points] or [0.0]
+            frame_shape = (max(int(np.ceil(max(ys))) + 1, 1), max(int(np.ceil(max(xs))) + 1, 1))
+        h, w = frame_shape[:2]
+        raster = np.zeros((h, w), dtype=np.int32)
+        rows = [np.zeros(len(rois), dtype=bool)]
+        for k, roi in enumerate(rois):
+            pts = np.round(np.array(roi.points, dtype=np.float64)).astype(np.int32)
+            x1, y1 = np.clip(pts.min(axis=0), 0, [w, h])
+            x2, y2 = np.clip(pts.max(axis=0) + 1, 0, [w, h])
+            if x2 <= x1 or y2 <= y1:
+                continue
+            # Solo se toca la ventana del ROI: cada etiqueta previa que cae dentro pasa a una nueva (previa + k).
+            polygon = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(polygon, [pts - np.array([x1, y1], dtype=np.int32)], 1)
+            inside = polygon.view(bool)
+            window = raster[y1:y2, x1:x2]
+            previous, inverse = np.unique(window[inside], return_inverse=True)
+            for label in previous.tolist():
+                row = rows[label].copy()
+                row[k] = True
+                rows.append(row)
+            window[inside] = (len(rows) - len(previous) + inverse).astype(np.int32)
+        self.raster = raster
+        self.table = np.stack(rows)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.raster.shape
+
+    def lookup(self, xs, ys) -> np.ndarray:
+        """Pertenencia (N, len(rois)) de los puntos ``(xs[i], ys[i])``."""
+        xs = np.rint(np.asarray(xs, dtype=np.float64)).astype(np.int64).reshape(-1)
+        ys = np.rint(np.asarray(ys, dtype=np.float64)).astype(np.int64).reshape(-1)
+        h, w = self.raster.shape
+        valid = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        labels = np.zeros(xs.shape, dtype=np.int32)
+        labels[valid] = self.raster[ys[valid], xs[valid]]
+        return self.table[labels]
+
+
 def _rect_to_points(rect: Sequence[float]) -> Tuple[Point, ...]:
     x1, y1, x2, y2 = rect
     return ((x1, y1), (x2, y1), (x2, y2), (x1, y2))
@@ -0,0 +1,230 @@
+"""Procesamiento paralelo de un video largo dividido en segmentos temporales.
+
+Cada segmento se procesa en un proceso propio (con su ``OnnxDetector`` y
+tracker) empezando ``overlap`` frames antes de su inicio nominal. En esa
+ventana compartida se emparejan los tracks locales con los del segmento
+anterior por IoU, se reasignan IDs globales y solo se conservan las filas que
+pertenecen a cada segmento. Los eventos de ROIs se recalculan en el proceso
+principal sobre los tracks ya unidos, igual que en una ejecución continua.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from src.config import AppConfig
+from src.tracker import Track, TrackHistory, bbox_iou, build_tracker
+from src.video_io import FrameData, count_frames, iter_frames
+
+BBox = Tuple[float, float, float, float]
+
+
+@dataclass(frozen=True)
+class Segment:
+    index: int
+    start: int  # primer frame leído (incluye el solapamiento)
+    owned_start: int  # primer frame cuyas filas pertenecen a este segmento
+    end: int  # exclusivo
+
+
+@dataclass
+class TrackRow:
+    frame: int
+    time_ms: Optional[float]
+    track_id: int
+    score: float
+    cls: int
+    bbox: BBox
+    prev_bbox: Optional[BBox]
+
+
+@dataclass
+class SegmentResult:
+    segment: Segment
+    fps: Optional[float]
+    frames: List[Tuple[int, Optional[float]]]  # (índice, time_ms) de cada frame procesado
+    rows: List[TrackRow]
+
+
+def _align(frame: int, every_n: int) -> int:
+    return (frame // every_n) * every_n
+
+
+def plan_segments(total_frames: int, segments: int, overlap_frames: int, every_n: int = 1) -> List[Segment]:
+    """Divide ``[0, total_frames)`` en tramos alineados a ``every_n`` para muestrear los mismos frames."""
+    every_n = max(every_n, 1)
+    segments = max(1, min(segments, total_frames // max(every_n, 1) or 1))
+    bounds = [_align(round(k * total_frames / segments), every_n) for k in range(segments)] + [total_frames]
+    plan: List[Segment] = []
+    for k in range(segments):
+        owned_start, end = bounds[k], bounds[k + 1]
+        if end <= owned_start:
+            continue
+        start = max(0, _align(owned_start - overlap_frames, every_n)) if k > 0 else 0
+        plan.append(Segment(index=len(plan), start=start, owned_start=owned_start, end=end))
+    return plan
+
+
+def process_segment(config: AppConfig, segment: Segment) -> SegmentResult:
+    """Detecta y trackea un segmento; se ejecuta dentro de un proceso del pool."""
+    from src.pipeline import OnnxDetector  # permite parchear el detector igual que en Pipeline
+
+    detector = OnnxDetector(str(config.model_path), config.detector)
+    tracker = build_tracker(config.tracker)
+    last_index: Optional[int] = None
+    frames: List[Tuple[int, Optional[float]]] = []
+    rows: List[TrackRow] = []
+    fps: Optional[float] = None
+    for frame_data in iter_frames(
+        config.source,
+        every_n=config.video.every_n_frames,
+        seek_stride=config.video.seek_stride,
+        start_frame=segment.start,
+        end_frame=segment.end,
+    ):
+        fps = frame_data.fps
+        frames.append((frame_data.index, frame_data.timestamp_ms))
+        gap = frame_data.index - last_index if last_index is not None else 1
+        last_index = frame_data.index
+        for track in tracker.update(detector(frame_data.image), frame_gap=gap):
+            rows.append(
+                TrackRow(
+                    frame=frame_data.index,
+                    time_ms=frame_data.timestamp_ms,
+                    track_id=track.track_id,
+                    score=track.score,
+                    cls=track.cls,
+                    bbox=track.bbox,
+                    prev_bbox=track.history[-1] if track.history else None,
+                )
+            )
+    return SegmentResult(segment=segment, fps=fps, frames=frames, rows=rows)
+
+
+def _match_overlap(
+    rows: List[TrackRow], previous: Dict[int, List[TrackRow]], segment: Segment, iou_match: float
+) -> Dict[int, int]:
+    # Acumula IoU por pareja (track local, track global) en la ventana compartida
+    # y asigna de forma voraz de mayor a menor evidencia, uno a uno.
+    votes: Dict[Tuple[int, int], float] = defaultdict(float)
+    for row in rows:
+        if row.frame >= segment.owned_start:
+            break
+        for prev in previous.get(row.frame, []):
+            iou = bbox_iou(row.bbox, prev.bbox)
+            if iou >= iou_match:
+                votes[(row.track_id, prev.track_id)] += iou
+    mapping: Dict[int, int] = {}
+    used = set()
+    for (local_id, global_id), _ in sorted(votes.items(), key=lambda kv: kv[1], reverse=True):
+        if local_id in mapping or global_id in used:
+            continue
+        mapping[local_id] = global_id
+        used.add(global_id)
+    return mapping
+
+
+def stitch_segments(results: List[SegmentResult], iou_match: float) -> List[TrackRow]:
+    """Une los resultados por segmento en filas con IDs globales, sin duplicar frames solapados."""
+    merged: List[TrackRow] = []
+    next_id = 1
+    previous: Dict[int, List[TrackRow]] = {}
+    for result in sorted(results, key=lambda r: r.segment.index):
+        segment = result.segment
+        rows = sorted(result.rows, key=lambda r: r.frame)
+        mapping = _match_overlap(rows, previous, segment, iou_match) if previous else {}
+        owned: Dict[int, List[TrackRow]] = defaultdict(list)
+        for row in rows:
+            if row.frame < segment.owned_start:
+                continue
+            if row.track_id not in mapping:
+                mapping[row.track_id] = next_id
+                next_id += 1
+            global_row = replace(row, track_id=mapping[row.track_id])
+            merged.append(global_row)
+            owned[row.frame].append(global_row)
+        previous = owned
+    return merged
+
+
+def run_segments(config: AppConfig, segments: List[Segment]) -> List[SegmentResult]:
+    workers = config.parallel.workers or min(len(segments), os.cpu_count() or 1)
+    if workers <= 1:
+        return [process_segment(config, segment) for segment in segments]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_segment, config, segment) for segment in segments]
+        return [future.result() for future in futures]
+
+
+def run_segmented(config: AppConfig) -> None:
+    from src.pipeline import Pipeline
+
+    if config.output:
+        logging.warning("El modo por segmentos no escribe video de salida; se ignora --output.")
+    if config.pose.enabled:
+        logging.warning("El modo por segmentos no usa pose; 'Pick' se infiere por área de bbox.")
+    total = count_frames(config.source)
+    if total <= 0:
+        raise ValueError("El modo por segmentos requiere un archivo con número de frames conocido.")
+    every_n = max(config.video.every_n_frames, 1)
+    if config.max_frames:
+        total = min(total, config.max_frames * every_n)
+    fps = _source_fps(config.source)
+    overlap = int(round(config.parallel.overlap_seconds * fps))
+    segments = plan_segments(total, config.parallel.segments, overlap, every_n)
+    logging.info(
+        "Inicio por segmentos | frames=%s | segmentos=%s | solapamiento=%s frames", total, len(segments), overlap
+    )
+
+    start_time = time.perf_counter()
+    results = run_segments(config, segments)
+    rows = stitch_segments(results, config.tracker.iou_match)
+
+    sink = Pipeline(replace(config, output=None, pose=replace(config.pose, enabled=False)), load_models=False)
+    sink.replay(_frames_with_tracks(results, rows))
+    processed = sum(1 for r in results for idx, _ in r.frames if idx >= r.segment.owned_start)
+    total_time = time.perf_counter() - start_time
+    logging.info(
+        "Fin por segmentos | frames=%s | tiempo=%.2fs | fps≈%.2f",
+        processed,
+        total_time,
+        processed / total_time if total_time > 0 else 0.0,
+    )
+
+
+def _source_fps(source: str) -> float:
+    import cv2
+
+    from src.video_io import open_capture
+
+    cap = open_capture(source)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+
+
+def _frames_with_tracks(results: List[SegmentResult], rows: List[TrackRow]):
+    by_frame: Dict[int, List[TrackRow]] = defaultdict(list)
+    for row in rows:
+        by_frame[row.frame].append(row)
+    for result in sorted(results, key=lambda r: r.segment.index):
+        for index, time_ms in result.frames:
+            if index < result.segment.owned_start:
+                continue
+            tracks = [
+                Track(
+                    track_id=row.track_id,
+                    bbox=row.bbox,
+                    score=row.score,
+                    cls=row.cls,
+                    history=TrackHistory.from_boxes([row.prev_bbox] if row.prev_bbox else [], capacity=1),
+                )
+                for row in by_frame.get(index, [])
+            ]
+            yield FrameData(index=index, image=None, timestamp_ms=time_ms, fps=result.fps), tracks
@@ -1,23 +1,111 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 import numpy as np
 
-from src.detector_onnx import Detection
+from src.detector_onnx import Detection, pairwise_iou
 from src.config import TrackerConfig
 
+if TYPE_CHECKING:  # pragma: no cover
+    from src.pose import PoseResult
+
+try:  # opcional: si SciPy está instalado se usa su solver (más rápido en componentes grandes)
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # pragma: no cover - depende del entorno
+    linear_sum_assignment = None
+
+
+BBox = Tuple[float, float, float, float]
+
+
+class TrackHistory:
+    """Buffer circular de capacidad fija con las cajas previas de un track y su frame.
+
+    Se comporta como una secuencia de cajas de la más antigua a la más reciente
+    (``history[-1]`` es la última), sin crecer con la duración del track.
+    """
+
+    def __init__(self, capacity: int = 32):
+        capacity = max(int(capacity), 1)
+        self._boxes = np.empty((capacity, 4), dtype=np.float64)
+        self._frames = np.empty(capacity, dtype=np.int64)
+        self._start = 0
+        self._size = 0
+
+    @classmethod
+    def from_boxes(cls, boxes, capacity: int = 32, frames=None) -> "TrackHistory":
+        history = cls(capacity)
+        for i, box in enumerate(boxes):
+            history.append(box, frames[i] if frames is not None else i)
+        return history
+
+    @property
+    def capacity(self) -> int:
+        return self._boxes.shape[0]
+
+    def append(self, box: BBox, frame: int = 0) -> None:
+        capacity = self.capacity
+        if self._size < capacity:
+            slot = (self._start + self._size) % capacity
+            self._size += 1
+        else:  # lleno: se sobrescribe la caja más antigua
+            slot = self._start
+            self._start = (self._start + 1) % capacity
+        self._boxes[slot] = box
+        self._frames[slot] = frame
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __getitem__(self, index: int) -> BBox:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("índice fuera del historial")
+        return tuple(self._boxes[(self._start + index) % self.capacity].tolist())
+
+    def __iter__(self):
+        return iter(tuple(box) for box in self.boxes().tolist())
+
+    def _order(self) -> np.ndarray:
+        return (self._start + np.arange(self._size)) % self.capacity
+
+    def boxes(self) -> np.ndarray:
+        """Cajas (N, 4) en orden cronológico (copia)."""
+        return self._boxes[self._order()]
+
+    def frames(self) -> np.ndarray:
+        return self._frames[self._order()]
+
+    def velocity(self, window: Optional[int] = None) -> Tuple[float, float]:
+        """Velocidad media del centro en píxeles/frame sobre las últimas ``window`` cajas."""
+        n = self._size if window is None else min(max(window, 2), self._size)
+        if n < 2:
+            return 0.0, 0.0
+        order = self._order()[-n:]
+        first, last = order[0], order[-1]
+        frames = float(self._frames[last] - self._frames[first]) or float(n - 1)
+        centers = (self._boxes[[first, last], 0:2] + self._boxes[[first, last], 2:4]) / 2
+        vx, vy = (centers[1] - centers[0]) / frames
+        return float(vx), float(vy)
+
 
 @dataclass
 class Track:
     track_id: int
-    bbox: Tuple[float, float, float, float]
+    bbox: BBox
     score: float
     cls: int
     hits: int = 1
     misses: int = 0
-    history: List[Tuple[float, float, float, float]] = field(default_factory=list)
+    history: TrackHistory = field(default_factory=TrackHistory)
+    frame: int = 0  # frame (reloj del tracker) de ``bbox``
+    pose: Optional[PoseResult] = None  # pose top-down del último frame detectado (solo dentro de ROIs)
 
 
 def bbox_iou(box1: Tuple[float, float, float, float], box2: Tuple[float, float, float, float]) -> float:
@@ -36,58 +124,410 @@ def bbox_iou(box1: Tuple[float, float, float, float], box2: Tuple[float, float,
     return inter_area / union
 
 
+def _hungarian(cost: np.ndarray) -> List[Tuple[int, int]]:
+    """Asignación de coste mínimo (Kuhn-Munkres por caminos aumentantes), filas <= columnas."""
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # p[j] = fila (1-based) asignada a la columna j
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    return [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+
+
+def solve_assignment(cost: np.ndarray) -> List[Tuple[int, int]]:
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+        return list(zip(rows.tolist(), cols.tolist()))
+    if cost.shape[0] <= cost.shape[1]:
+        return _hungarian(cost)
+    return [(r, c) for c, r in _hungarian(cost.T)]
+
+
+def _components(track_idx: np.ndarray, det_idx: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+    # Componentes conexas del grafo bipartito de parejas candidatas (union-find).
+    parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for t, d in zip(track_idx.tolist(), det_idx.tolist()):
+        a, b = find(("t", t)), find(("d", d))
+        if a != b:
+            parent[a] = b
+    groups: Dict[Tuple[str, int], Tuple[List[int], List[int]]] = {}
+    for node in list(parent):
+        tracks, dets = groups.setdefault(find(node), ([], []))
+        (tracks if node[0] == "t" else dets).append(node[1])
+    return list(groups.values())
+
+
+def associate(iou: np.ndarray, iou_match: float, method: str = "hungarian") -> List[Tuple[int, int]]:
+    """Empareja filas (tracks) y columnas (detecciones) de una matriz IoU.
+
+    ``hungarian`` maximiza la IoU total entre parejas con IoU >= ``iou_match``,
+    resolviendo cada componente conexa del grafo de candidatos por separado
+    (en escenas reales son pequeñas). ``greedy`` toma las parejas de mayor IoU
+    primero.
+    """
+    track_idx, det_idx = np.nonzero(iou >= iou_match)
+    return associate_pairs(track_idx, det_idx, iou[track_idx, det_idx], method)
+
+
+def associate_pairs(
+    track_idx: np.ndarray, det_idx: np.ndarray, values: np.ndarray, method: str = "hungarian"
+) -> List[Tuple[int, int]]:
+    """Como ``associate`` pero sobre parejas candidatas dispersas que ya superan el umbral de IoU."""
+    if method not in ("hungarian", "greedy"):
+        raise ValueError(f"Método de asignación inválido: {method}")
+    if track_idx.size == 0:
+        return []
+    # Orden canónico (fila, columna) para que el resultado no dependa de cómo se generaron las parejas.
+    order = np.lexsort((det_idx, track_idx))
+    track_idx, det_idx, values = track_idx[order], det_idx[order], values[order]
+    if method == "greedy":
+        order = np.argsort(-values, kind="stable")
+        used_t, used_d, matches = set(), set(), []
+        for t, d in zip(track_idx[order].tolist(), det_idx[order].tolist()):
+            if t in used_t or d in used_d:
+                continue
+            used_t.add(t)
+            used_d.add(d)
+            matches.append((t, d))
+        return matches
+    components = _components(track_idx, det_idx)
+    label = np.empty(int(track_idx.max()) + 1, dtype=np.int64)
+    for k, (tracks, _) in enumerate(components):
+        label[tracks] = k
+    pair_label = label[track_idx]
+    by_label = np.argsort(pair_label, kind="stable")
+    bounds = np.searchsorted(pair_label[by_label], np.arange(len(components) + 1))
+    matches = []
+    for k, (tracks, dets) in enumerate(components):
+        if len(tracks) == 1 and len(dets) == 1:
+            matches.append((tracks[0], dets[0]))
+            continue
+        sel = by_label[bounds[k] : bounds[k + 1]]
+        rows_ids, cols_ids = np.sort(tracks), np.sort(dets)
+        cost = np.full((len(rows_ids), len(cols_ids)), 1e6)
+        cost[np.searchsorted(rows_ids, track_idx[sel]), np.searchsorted(cols_ids, det_idx[sel])] = 1.0 - values[sel]
+        for r, c in solve_assignment(cost):
+            if cost[r, c] < 1e6:
+                matches.append((int(rows_ids[r]), int(cols_ids[c])))
+    return matches
+
+
+def pair_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """IoU fila a fila entre ``boxes_a`` (K,4) y ``boxes_b`` (K,4)."""
+    inter_w = np.maximum(0.0, np.minimum(boxes_a[:, 2], boxes_b[:, 2]) - np.maximum(boxes_a[:, 0], boxes_b[:, 0]))
+    inter_h = np.maximum(0.0, np.minimum(boxes_a[:, 3], boxes_b[:, 3]) - np.maximum(boxes_a[:, 1], boxes_b[:, 1]))
+    inter = inter_w * inter_h
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return inter / (area_a + area_b - inter + 1e-6)
+
+
+class SpatialGrid:
+    """Índice de rejilla uniforme sobre las cajas de los tracks.
+
+    Cada caja se registra en todas las celdas que toca, así dos cajas con
+    intersección no vacía comparten al menos una celda y la consulta no pierde
+    candidatos. ``sync`` solo mueve las entradas cuyo rango de celdas cambió.
+    """
+
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("cell_size debe ser positivo")
+        self.cell_size = float(cell_size)
+        self.cells: Dict[Tuple[int, int], set] = {}
+        self._ranges: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def _cell_ranges(self, boxes: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        return np.floor(np.asarray(boxes, dtype=np.float64).reshape(-1, 4) / self.cell_size).astype(np.int64).tolist()
+
+    def _add(self, key: int, cell_range) -> None:
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), set()).add(key)
+        self._ranges[key] = tuple(cell_range)
+
+    def remove(self, key: int) -> None:
+        cell_range = self._ranges.pop(key, None)
+        if cell_range is None:
+            return
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.cells[(cx, cy)]
+
+    def sync(self, keys: List[int], boxes: np.ndarray) -> None:
+        """Inserta o mueve ``keys`` a las celdas de ``boxes``; las que no cambian de celda no se tocan."""
+        for key, cell_range in zip(keys, self._cell_ranges(boxes)):
+            current = self._ranges.get(key)
+            if current is not None and list(current) == cell_range:
+                continue
+            if current is not None:
+                self.remove(key)
+            self._add(key, cell_range)
+
+    def candidates(self, boxes: np.ndarray) -> Tuple[List[int], List[int]]:
+        """Parejas (clave, índice de caja) que comparten alguna celda."""
+        keys: List[int] = []
+        idx: List[int] = []
+        cells = self.cells
+        for j, (x0, y0, x1, y1) in enumerate(self._cell_ranges(boxes)):
+            found = set()
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket:
+                        found |= bucket
+            keys.extend(found)
+            idx.extend([j] * len(found))
+        return keys, idx
+
+
 class IoUTracker:
     def __init__(self, config: TrackerConfig):
         self.config = config
         self.tracks: Dict[int, Track] = {}
         self.next_id = 1
+        self.frame = 0  # frames de video acumulados según ``frame_gap``
+        self._grid: Optional[SpatialGrid] = None
+
+    def coast(self) -> List[Track]:
+        """Devuelve los tracks actuales sin modificarlos (frames sin detección por escena estática)."""
+        return list(self.tracks.values())
 
-    def update(self, detections: List[Detection]) -> List[Track]:
+    def update(self, detections: List[Detection], frame_gap: int = 1) -> List[Track]:
+        """Asocia ``detections`` a los tracks; ``frame_gap`` son los frames de video desde la última llamada."""
         if not detections and not self.tracks:
             return []
 
-        det_bboxes = [det.bbox for det in detections]
+        self.frame += max(frame_gap, 1)
+        tracks = list(self.tracks.values())
+        track_boxes = self._expected_boxes(tracks, frame_gap)
         det_used = [False] * len(detections)
-
-        # Asociar detecciones a tracks existentes por IoU máximo
-        for track in list(self.tracks.values()):
-            best_iou = 0.0
-            best_j = -1
-            for j, bbox in enumerate(det_bboxes):
-                if det_used[j]:
-                    continue
-                iou = bbox_iou(track.bbox, bbox)
-                if iou > best_iou:
-                    best_iou = iou
-                    best_j = j
-            if best_iou >= self.config.iou_match and best_j >= 0:
-                det = detections[best_j]
-                track.history.append(track.bbox)
-                track.bbox = det.bbox
-                track.score = det.score
-                track.cls = det.cls
-                track.hits += 1
-                track.misses = 0
-                det_used[best_j] = True
+        if tracks and detections:
+            det_boxes = np.array([d.bbox for d in detections], dtype=np.float64)
+            grid = self._spatial_index(tracks, track_boxes, det_boxes)
+            if grid is None:
+                # Matriz IoU completa tracks × detecciones y asignación global.
+                iou = pairwise_iou(track_boxes, det_boxes)
+                matches = associate(iou, self.config.iou_match, self.config.assignment)
             else:
+                # Solo se puntúan las parejas que comparten celda en la rejilla.
+                keys, det_idx = grid.candidates(det_boxes)
+                position = {t.track_id: i for i, t in enumerate(tracks)}
+                track_idx = np.array([position[k] for k in keys], dtype=np.int64)
+                det_idx = np.array(det_idx, dtype=np.int64)
+                values = pair_iou(track_boxes[track_idx], det_boxes[det_idx])
+                keep = values >= self.config.iou_match
+                matches = associate_pairs(track_idx[keep], det_idx[keep], values[keep], self.config.assignment)
+        else:
+            matches = []
+
+        matched_tracks = set()
+        for ti, dj in matches:
+            track = tracks[ti]
+            det = detections[dj]
+            track.history.append(track.bbox, track.frame)
+            track.bbox = det.bbox
+            track.frame = self.frame
+            track.score = det.score
+            track.cls = det.cls
+            track.hits += 1
+            track.misses = 0
+            det_used[dj] = True
+            matched_tracks.add(ti)
+            self._on_match(track, det)
+        for ti, track in enumerate(tracks):
+            if ti not in matched_tracks:
                 track.misses += 1
+                self._on_miss(track, track_boxes[ti])
 
         # Crear tracks nuevos para detecciones no usadas
         for j, used in enumerate(det_used):
             if not used:
                 det = detections[j]
-                self.tracks[self.next_id] = Track(
+                track = Track(
                     track_id=self.next_id,
                     bbox=det.bbox,
                     score=det.score,
                     cls=det.cls,
+                    history=TrackHistory(self.config.history_size),
+                    frame=self.frame,
                 )
+                self.tracks[self.next_id] = track
+                self._on_new(track)
                 self.next_id += 1
 
         # Filtrar tracks desaparecidos
-        self.tracks = {
+        alive = {
             tid: t
             for tid, t in self.tracks.items()
             if t.misses <= self.config.max_missed and t.hits >= self.config.min_hits
         }
+        for tid in self.tracks.keys() - alive.keys():
+            if self._grid is not None:
+                self._grid.remove(tid)
+            self._on_removed(tid)
+        self.tracks = alive
         return list(self.tracks.values())
+
+    def _spatial_index(
+        self, tracks: List[Track], track_boxes: np.ndarray, det_boxes: np.ndarray
+    ) -> Optional[SpatialGrid]:
+        """Rejilla sobre las cajas esperadas de los tracks, activa a partir de ``grid_min_tracks``.
+
+        Se crea al superar el umbral y se descarta (con histéresis) cuando baja
+        de la mitad; mientras existe se actualiza de forma incremental.
+        """
+        min_tracks = self.config.grid_min_tracks
+        if min_tracks <= 0 or len(tracks) < (min_tracks // 2 if self._grid is not None else min_tracks):
+            self._grid = None
+            return None
+        if self._grid is None:
+            cell = self.config.grid_cell_size
+            if cell <= 0:
+                # Automático: el doble de la mediana del lado de las cajas.
+                sizes = np.concatenate([track_boxes[:, 2:] - track_boxes[:, :2], det_boxes[:, 2:] - det_boxes[:, :2]])
+                cell = 2.0 * max(float(np.median(sizes)), 1.0)
+            self._grid = SpatialGrid(cell)
+        self._grid.sync([t.track_id for t in tracks], track_boxes)
+        return self._grid
+
+    # Puntos de extensión para trackers con modelo de movimiento.
+    def _expected_boxes(self, tracks: List[Track], frame_gap: int) -> np.ndarray:
+        return np.array([t.bbox for t in tracks], dtype=np.float64).reshape(-1, 4)
+
+    def _on_match(self, track: Track, det: Detection) -> None:
+        pass
+
+    def _on_miss(self, track: Track, expected_box: np.ndarray) -> None:
+        pass
+
+    def _on_new(self, track: Track) -> None:
+        pass
+
+    def _on_removed(self, track_id: int) -> None:
+        pass
+
+
+def _xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    wh = boxes[..., 2:4] - boxes[..., 0:2]
+    return np.concatenate([boxes[..., 0:2] + wh / 2, wh], axis=-1)
+
+
+def _cxcywh_to_xyxy(state: np.ndarray) -> np.ndarray:
+    half = state[..., 2:4] / 2
+    return np.concatenate([state[..., 0:2] - half, state[..., 0:2] + half], axis=-1)
+
+
+class KalmanTracker(IoUTracker):
+    """IoUTracker con filtro de Kalman de velocidad constante sobre (cx, cy, w, h).
+
+    Antes de asociar, cada track se predice ``frame_gap`` frames hacia adelante,
+    así un objeto rápido sigue solapando su detección aunque se salten frames.
+    El ruido escala con el tamaño de la caja (como en SORT/DeepSORT).
+    """
+
+    _POS_STD = 1.0 / 20
+    _VEL_STD = 1.0 / 160
+
+    def __init__(self, config: TrackerConfig):
+        super().__init__(config)
+        self._mean: Dict[int, np.ndarray] = {}
+        self._cov: Dict[int, np.ndarray] = {}
+        self._H = np.eye(4, 8)
+
+    def _expected_boxes(self, tracks: List[Track], frame_gap: int) -> np.ndarray:
+        if not tracks:
+            return np.zeros((0, 4))
+        dt = float(max(frame_gap, 1))
+        F = np.eye(8)
+        F[:4, 4:] = np.eye(4) * dt
+        mean = np.stack([self._mean[t.track_id] for t in tracks])
+        cov = np.stack([self._cov[t.track_id] for t in tracks])
+        size = np.repeat(mean[:, 2:4], 2, axis=1)  # w, h, w, h
+        q = np.concatenate([(self._POS_STD * size) ** 2, (self._VEL_STD * size) ** 2], axis=1) * dt
+        mean = mean @ F.T
+        cov = np.einsum("ij,njk,lk->nil", F, cov, F) + q[:, :, None] * np.eye(8)
+        for track, m, c in zip(tracks, mean, cov):
+            self._mean[track.track_id] = m
+            self._cov[track.track_id] = c
+        return _cxcywh_to_xyxy(mean[:, :4])
+
+    def _on_match(self, track: Track, det: Detection) -> None:
+        z = _xyxy_to_cxcywh(np.asarray(det.bbox, dtype=np.float64))
+        mean, cov, H = self._mean[track.track_id], self._cov[track.track_id], self._H
+        r = np.diag((self._POS_STD * np.repeat(z[2:4], 2)) ** 2)
+        s = H @ cov @ H.T + r
+        gain = cov @ H.T @ np.linalg.inv(s)
+        self._mean[track.track_id] = mean + gain @ (z - H @ mean)
+        self._cov[track.track_id] = (np.eye(8) - gain @ H) @ cov
+
+    def _on_miss(self, track: Track, expected_box: np.ndarray) -> None:
+        track.bbox = tuple(float(v) for v in expected_box)
+        track.frame = self.frame
+
+    def _on_new(self, track: Track) -> None:
+        z = _xyxy_to_cxcywh(np.asarray(track.bbox, dtype=np.float64))
+        std = np.concatenate([2 * self._POS_STD * np.repeat(z[2:4], 2), 10 * self._VEL_STD * np.repeat(z[2:4], 2)])
+        self._mean[track.track_id] = np.concatenate([z, np.zeros(4)])
+        self._cov[track.track_id] = np.diag(std**2)
+
+    def _on_removed(self, track_id: int) -> None:
+        self._mean.pop(track_id, None)
+        self._cov.pop(track_id, None)
+
+    def velocity(self, track_id: int) -> Tuple[float, float]:
+        """Velocidad estimada del centro en píxeles/frame."""
+        mean = self._mean[track_id]
+        return float(mean[4]), float(mean[5])
+
+
+def build_tracker(config: TrackerConfig) -> IoUTracker:
+    if config.kind == "kalman":
+        return KalmanTracker(config)
+    if config.kind != "iou":
+        raise ValueError(f"Tipo de tracker inválido: {config.kind}")
+    return IoUTracker(config)
@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import logging
 import os
+import queue
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Generator, Optional, Tuple
+from typing import Generator, Iterator, Optional, Tuple
 
 import cv2
 
+DROP_POLICIES = ("block", "oldest", "newest")
+
 
 @dataclass
 class FrameData:
@@ -31,31 +35,188 @@ def open_capture(source: str) -> cv2.VideoCapture:
     return cap
 
 
-def iter_frames(source: str, every_n: int = 1, max_frames: Optional[int] = None) -> Generator[FrameData, None, None]:
-    cap = open_capture(source)
+def _read_frames(
+    cap: cv2.VideoCapture,
+    every_n: int,
+    max_frames: Optional[int],
+    seek: bool = False,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Generator[FrameData, None, None]:
+    # Los frames saltados solo se "grab"-ean (sin decodificar/convertir color);
+    # con seek=True se salta directamente al siguiente frame objetivo.
+    # ``start``/``stop`` acotan el rango de índices globales leídos.
     try:
         idx = 0
         yielded = 0
         fps = cap.get(cv2.CAP_PROP_FPS) or None
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if stop is not None:
+            total = min(total, stop) if total else stop
+        if start > 0:
+            if not cap.set(cv2.CAP_PROP_POS_FRAMES, start):
+                raise RuntimeError(f"La fuente no admite seek al frame {start}")
+            idx = start
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                logging.warning("Lectura de frame fallida en idx=%s; deteniendo.", idx)
+            if stop is not None and idx >= stop:
                 break
-            if idx % every_n == 0:
-                timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-                yield FrameData(index=idx, image=frame, timestamp_ms=timestamp_ms if timestamp_ms > 0 else None, fps=fps)
-        while True:
+            if idx % every_n != 0:
+                if not cap.grab():
+                    break
+                idx += 1
+                continue
             ret, frame = cap.read()
             if not ret:
                 break
-            if idx % every_n == 0:
-                timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
-                yield FrameData(index=idx, image=frame, timestamp_ms=timestamp_ms if timestamp_ms > 0 else None)
-                yielded += 1
-                if max_frames and yielded >= max_frames:
-                    break
+            timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            yield FrameData(index=idx, image=frame, timestamp_ms=timestamp_ms if timestamp_ms > 0 else None, fps=fps)
+            yielded += 1
+            if max_frames and yielded >= max_frames:
+                break
             idx += 1
+            if seek and every_n > 1:
+                target = idx - 1 + every_n
+                if total and target >= total:
+                    break
+                if cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                    idx = target
+                else:
+                    logging.warning("La fuente no admite seek; se continúa con grab().")
+                    seek = False
+    finally:
+        cap.release()
+
+
+class _ReaderError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+_END = object()
+
+
+class FramePrefetcher:
+    """Decodifica frames en un hilo de fondo y los deja en una cola acotada.
+
+    Políticas cuando la cola está llena:
+    - ``block``: el lector espera (no se pierden frames; apto para archivos).
+    - ``oldest``: se descarta el frame más antiguo en cola (menor latencia en vivo).
+    - ``newest``: se descarta el frame recién leído.
+    """
+
+    def __init__(self, frames: Iterator[FrameData], depth: int, drop_policy: str = "block"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Política de descarte inválida: {drop_policy} (opciones: {', '.join(DROP_POLICIES)})")
+        self._frames = frames
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, depth))
+        self._drop_policy = drop_policy
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="frame-prefetch", daemon=True)
+        self.dropped = 0
+
+    def _put_blocking(self, item: object) -> None:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _put(self, frame: FrameData) -> None:
+        if self._drop_policy == "block":
+            self._put_blocking(frame)
+        elif self._drop_policy == "newest":
+            try:
+                self._queue.put_nowait(frame)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put_nowait(frame)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def _worker(self) -> None:
+        try:
+            for frame in self._frames:
+                if self._stop.is_set():
+                    break
+                self._put(frame)
+        except Exception as exc:  # se propaga al consumidor
+            self._put_blocking(_ReaderError(exc))
+        finally:
+            close = getattr(self._frames, "close", None)
+            if close:
+                close()
+            self._put_blocking(_END)
+
+    def __iter__(self) -> Generator[FrameData, None, None]:
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, _ReaderError):
+                    raise item.exc
+                yield item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+        if self.dropped:
+            logging.info("Prefetch de frames: %s frames descartados (política=%s)", self.dropped, self._drop_policy)
+
+
+def iter_frames(
+    source: str,
+    every_n: int = 1,
+    max_frames: Optional[int] = None,
+    prefetch: int = 0,
+    drop_policy: str = "block",
+    seek_stride: int = 0,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+) -> Generator[FrameData, None, None]:
+    """Itera frames de ``source`` procesando uno de cada ``every_n``.
+
+    ``seek_stride`` > 0 activa el salto por seek en archivos cuando ``every_n``
+    alcanza ese valor; por debajo se usa ``grab()``, que evita decodificar
+    los frames descartados pero mantiene la lectura secuencial.
+    ``start_frame``/``end_frame`` (exclusivo) limitan la lectura a un tramo del
+    archivo conservando los índices globales de frame.
+    """
+    cap = open_capture(source)
+    every_n = max(every_n, 1)
+    seek = bool(seek_stride) and not source.isdigit() and every_n >= seek_stride
+    frames = _read_frames(cap, every_n, max_frames, seek=seek, start=start_frame, stop=end_frame)
+    if prefetch > 0:
+        yield from FramePrefetcher(frames, prefetch, drop_policy)
+    else:
+        yield from frames
+
+
+def count_frames(source: str) -> int:
+    """Número de frames declarado por el contenedor (0 si es desconocido o es una cámara)."""
+    if source.isdigit():
+        return 0
+    cap = open_capture(source)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
     finally:
         cap.release()
 
@@ -65,8 +226,6 @@ class VideoWriter:
         path.parent.mkdir(parents=True, exist_ok=True)
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         self.writer = cv2.VideoWriter(str(path), fourcc, fps if fps and fps > 0 else 30.0, frame_size)
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        self.writer = cv2.VideoWriter(str(path), fourcc, fps, frame_size)
         if not self.writer.isOpened():
             raise RuntimeError(f"No se pudo abrir escritor de video en {path}")
 
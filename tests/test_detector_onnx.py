@@ -0,0 +1,200 @@
+import unittest
+
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from src.config import DetectorConfig, SessionConfig
+    from src.detector_onnx import (
+        LetterboxPreprocessor,
+        OnnxDetector,
+        batched_nms,
+        build_session_options,
+        decode_predictions,
+        letterbox,
+        non_max_suppression,
+    )
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class _Input:
+    def __init__(self, shape):
+        self.name = "images"
+        self.shape = shape
+
+
+class FakeSession:
+    """Devuelve una caja por imagen con cls = brillo del píxel central (0..9)."""
+
+    def __init__(self, batch_dim="batch"):
+        self.batch_dim = batch_dim
+        self.calls = []
+
+    def get_inputs(self):
+        return [_Input([self.batch_dim, 3, 64, 64])]
+
+    def run(self, output_names, feeds):
+        blob = feeds["images"]
+        self.calls.append(blob.shape[0])
+        preds = np.zeros((blob.shape[0], 1, 6), dtype=np.float32)
+        for i in range(blob.shape[0]):
+            preds[i, 0] = [8, 8, 40, 40, 0.9, round(float(blob[i, 0, 32, 32]) * 9)]
+        return [preds]
+
+
+def make_detector(session) -> "OnnxDetector":
+    detector = OnnxDetector.__new__(OnnxDetector)
+    detector.config = DetectorConfig(conf=0.25, iou=0.45, imgsz=64)
+    detector.session = session
+    detector.input_name = "images"
+    detector.output_names = ["output"]
+    detector.fixed_batch = OnnxDetector._fixed_batch_size(session)
+    detector.preprocessor = LetterboxPreprocessor(64)
+    return detector
+
+
+@unittest.skipUnless(np, "NumPy/ONNXRuntime requeridos")
+class DetectBatchTests(unittest.TestCase):
+    def _images(self, n):
+        return [np.full((48, 64, 3), int(round(i * 255 / 9)), dtype=np.uint8) for i in range(n)]
+
+    def test_batch_results_map_to_frames(self):
+        session = FakeSession()
+        detector = make_detector(session)
+        results = detector.detect_batch(self._images(4))
+        self.assertEqual(session.calls, [4])
+        self.assertEqual([r[0].cls for r in results], [0, 1, 2, 3])
+        single = detector(self._images(4)[2])
+        self.assertEqual(single[0].bbox, results[2][0].bbox)
+
+    def test_fixed_batch_falls_back_to_chunks(self):
+        session = FakeSession(batch_dim=1)
+        detector = make_detector(session)
+        results = detector.detect_batch(self._images(3))
+        self.assertEqual(session.calls, [1, 1, 1])
+        self.assertEqual([r[0].cls for r in results], [0, 1, 2])
+
+        session = FakeSession(batch_dim=2)
+        detector = make_detector(session)
+        results = detector.detect_batch(self._images(3))
+        self.assertEqual(session.calls, [2, 2])
+        self.assertEqual([r[0].cls for r in results], [0, 1, 2])
+
+    def test_detect_regions_maps_back_to_frame(self):
+        session = FakeSession()
+        detector = make_detector(session)
+        frame = np.zeros((200, 300, 3), dtype=np.uint8)
+        frame[50:114, 100:164] = 255
+        detections = detector.detect_regions(frame, [(10, 10, 74, 74), (100, 50, 164, 114)])
+        self.assertEqual(session.calls, [2])
+        self.assertEqual([d.cls for d in detections], [0, 9])
+        self.assertEqual(detections[0].bbox, (18.0, 18.0, 50.0, 50.0))
+        self.assertEqual(detections[1].bbox, (108.0, 58.0, 140.0, 90.0))
+        self.assertEqual(detector.detect_regions(frame, []), [])
+
+
+def _random_preds(rng, n, num_classes=3, size=640):
+    xy = rng.uniform(-20, size, (n, 2))
+    wh = rng.uniform(5, 120, (n, 2))
+    scores = rng.uniform(0, 1, (n, 1))
+    classes = rng.integers(0, num_classes, (n, 1))
+    return np.concatenate([xy, xy + wh, scores, classes], axis=1).astype(np.float32)
+
+
+@unittest.skipUnless(np, "NumPy/ONNXRuntime requeridos")
+class VectorizedNmsTests(unittest.TestCase):
+    def test_matches_greedy_nms(self):
+        rng = np.random.default_rng(2)
+        for n in (1, 5, 60, 400):
+            preds = _random_preds(rng, n)
+            for thresh in (0.3, 0.45, 0.7):
+                expected = non_max_suppression(preds, thresh)
+                keep = batched_nms(preds[:, :4], preds[:, 4], None, thresh)
+                self.assertEqual(keep.tolist(), expected)
+
+    def test_class_aware_matches_per_class_nms(self):
+        rng = np.random.default_rng(3)
+        preds = _random_preds(rng, 300, num_classes=4)
+        keep = batched_nms(preds[:, :4], preds[:, 4], preds[:, 5], 0.45)
+        expected = []
+        for cls in range(4):
+            idx = np.where(preds[:, 5] == cls)[0]
+            expected.extend(idx[non_max_suppression(preds[idx], 0.45)].tolist())
+        self.assertEqual(sorted(keep.tolist()), sorted(expected))
+        self.assertTrue(np.all(np.diff(preds[keep, 4]) <= 0))
+
+    def test_decode_matches_scalar_postprocess(self):
+        rng = np.random.default_rng(4)
+        preds = _random_preds(rng, 250)
+        scale, pad, shape = 0.5, (0, 140), (720, 1280)
+        decoded = decode_predictions(preds[None], 0.25, 0.45, scale, pad, shape)
+
+        filtered = preds[preds[:, 4] >= 0.25]
+        keep = non_max_suppression(filtered, 0.45)
+        self.assertEqual(len(decoded), len(keep))
+        for row, (box, score, cls) in zip(keep, zip(decoded.boxes, decoded.scores, decoded.classes)):
+            x1, y1, x2, y2, ref_score, ref_cls = filtered[row]
+            ref_box = [
+                np.clip((x1 - pad[0]) / scale, 0, shape[1]),
+                np.clip((y1 - pad[1]) / scale, 0, shape[0]),
+                np.clip((x2 - pad[0]) / scale, 0, shape[1]),
+                np.clip((y2 - pad[1]) / scale, 0, shape[0]),
+            ]
+            np.testing.assert_allclose(box, ref_box, rtol=1e-6)
+            self.assertEqual((score, cls), (ref_score, int(ref_cls)))
+        self.assertEqual(len(decode_predictions(preds[:, :5], 0.25, 0.45, scale, pad, shape)), 0)
+
+
+@unittest.skipUnless(np, "NumPy/ONNXRuntime requeridos")
+class LetterboxPreprocessorTests(unittest.TestCase):
+    @staticmethod
+    def _reference(image, size):
+        img, scale, pad = letterbox(image, size)
+        img = img[:, :, ::-1].astype(np.float32) / 255.0
+        return np.transpose(img, (2, 0, 1))[None, ...], scale, pad
+
+    def test_matches_letterbox_and_reuses_buffers(self):
+        rng = np.random.default_rng(0)
+        pre = LetterboxPreprocessor(96)
+        first = None
+        for shape in [(72, 128, 3), (72, 128, 3), (128, 50, 3), (96, 96, 3)]:
+            image = rng.integers(0, 255, shape, dtype=np.uint8)
+            blob, scale, pad = pre(image)
+            ref, ref_scale, ref_pad = self._reference(image, 96)
+            np.testing.assert_array_equal(blob, ref)
+            self.assertEqual((scale, pad), (ref_scale, ref_pad))
+            if first is None:
+                first = blob
+            self.assertTrue(np.shares_memory(blob, first))
+
+    def test_fill_batch_slots(self):
+        rng = np.random.default_rng(1)
+        images = [rng.integers(0, 255, (40, 80, 3), dtype=np.uint8), rng.integers(0, 255, (80, 40, 3), dtype=np.uint8)]
+        pre = LetterboxPreprocessor(64)
+        batch, metas = pre.fill(images, batch=3)
+        self.assertEqual(batch.shape, (3, 3, 64, 64))
+        for i, image in enumerate(images):
+            ref, scale, pad = self._reference(image, 64)
+            np.testing.assert_array_equal(batch[i : i + 1], ref)
+            self.assertEqual(metas[i], (scale, pad))
+
+
+@unittest.skipUnless(np, "NumPy/ONNXRuntime requeridos")
+class SessionOptionsTests(unittest.TestCase):
+    def test_session_config_is_applied(self):
+        options = build_session_options(
+            SessionConfig(intra_op_threads=3, inter_op_threads=2, graph_optimization="basic", enable_mem_arena=False)
+        )
+        self.assertEqual(options.intra_op_num_threads, 3)
+        self.assertEqual(options.inter_op_num_threads, 2)
+        self.assertEqual(options.graph_optimization_level, ort.GraphOptimizationLevel.ORT_ENABLE_BASIC)
+        self.assertFalse(options.enable_cpu_mem_arena)
+
+        options = build_session_options(SessionConfig(allow_spinning=False))
+        self.assertEqual(options.get_session_config_entry("session.intra_op.allow_spinning"), "0")
+        with self.assertRaises(ValueError):
+            build_session_options(SessionConfig(graph_optimization="max"))
+
+
+if __name__ == "__main__":
+    unittest.main()
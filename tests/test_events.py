@@ -0,0 +1,117 @@
+import unittest
+
+import numpy as np
+
+from src.events import RoiEventEngine
+
+
+class ReferenceInteractions:
+    """Máquina de estados anterior (dicts por track y ROI), como referencia."""
+
+    def __init__(self, roi_ids, approach_seconds):
+        self.roi_ids = roi_ids
+        self.approach_seconds = approach_seconds
+        self.interactions = {}
+
+    def _close(self, track_id, roi_id, state, leave_time, events):
+        if state["approach_start"] is not None:
+            events.append((track_id, roi_id, "Approach", state["approach_start"], leave_time))
+        if state["pick_time"] is not None:
+            events.append((track_id, roi_id, "Pick", state["pick_time"], leave_time))
+        events.append((track_id, roi_id, "Leave", leave_time, leave_time))
+
+    def step(self, track_ids, inside, area_changed, wrist_hits, t):
+        events = []
+        for i, track_id in enumerate(track_ids):
+            states = self.interactions.get(track_id, {})
+            for r, roi_id in enumerate(self.roi_ids):
+                state = states.get(roi_id)
+                if inside[i, r]:
+                    if state is None:
+                        state = {"enter_time": t, "approach_start": None, "pick_time": None}
+                        states[roi_id] = state
+                    if state["approach_start"] is None and t - state["enter_time"] >= self.approach_seconds:
+                        state["approach_start"] = state["enter_time"]
+                    if state["pick_time"] is None:
+                        pick = bool(wrist_hits[r]) if wrist_hits is not None else False
+                        if pick or area_changed[i]:
+                            state["pick_time"] = t
+                elif state is not None:
+                    self._close(track_id, roi_id, states.pop(roi_id), t, events)
+            if states:
+                self.interactions[track_id] = states
+            else:
+                self.interactions.pop(track_id, None)
+        alive = set(track_ids)
+        for track_id in [tid for tid in self.interactions if tid not in alive]:
+            for roi_id, state in self.interactions.pop(track_id).items():
+                self._close(track_id, roi_id, state, t, events)
+        return events
+
+    def states(self, track_id):
+        result = []
+        for roi_id, state in self.interactions.get(track_id, {}).items():
+            if state["pick_time"] is not None:
+                result.append((roi_id, "Pick"))
+            elif state["approach_start"] is not None:
+                result.append((roi_id, "Approach"))
+            else:
+                result.append((roi_id, "In"))
+        return result
+
+
+class RoiEventEngineTests(unittest.TestCase):
+    def test_matches_reference_state_machine(self):
+        rng = np.random.default_rng(11)
+        roi_ids = [f"r{k}" for k in range(12)]
+        engine = RoiEventEngine(roi_ids, approach_seconds=0.4, pick_area_delta=0.2, capacity=4)
+        reference = ReferenceInteractions(roi_ids, approach_seconds=0.4)
+        alive = list(range(1, 31))
+        next_id = 31
+        inside = {tid: rng.random(len(roi_ids)) < 0.2 for tid in alive}
+        total_events = 0
+        for frame in range(300):
+            t = frame * 0.1
+            # Tracks que mueren y nacen; pertenencia con persistencia entre frames.
+            for tid in list(alive):
+                if rng.random() < 0.02:
+                    alive.remove(tid)
+            for _ in range(rng.poisson(0.6)):
+                alive.insert(int(rng.integers(0, len(alive) + 1)), next_id)
+                inside[next_id] = rng.random(len(roi_ids)) < 0.2
+                next_id += 1
+            for tid in alive:
+                flip = rng.random(len(roi_ids)) < 0.08
+                inside[tid] = inside[tid] ^ flip
+            matrix = np.array([inside[tid] for tid in alive], dtype=bool).reshape(-1, len(roi_ids))
+            area_changed = rng.random(len(alive)) < 0.05
+            wrist_hits = rng.random(len(roi_ids)) < 0.05 if frame % 3 == 0 else None
+
+            expected = reference.step(alive, matrix, area_changed, wrist_hits, t)
+            got = engine.step(list(alive), matrix, area_changed, wrist_hits, t)
+            self.assertEqual(got, expected, f"frame {frame}")
+            total_events += len(got)
+            for tid in alive:
+                self.assertEqual(engine.states(tid), reference.states(tid))
+            self.assertEqual(len(engine), len(reference.interactions))
+        self.assertGreater(total_events, 500)
+
+    def test_approach_and_pick_times(self):
+        engine = RoiEventEngine(["a", "b"], approach_seconds=1.0, pick_area_delta=0.2)
+        both = np.array([[True, True]])
+        self.assertEqual(engine.step([7], both, np.array([False]), None, 0.0), [])
+        engine.step([7], both, np.array([False]), np.array([False, True]), 0.5)
+        engine.step([7], both, np.array([False]), None, 1.0)
+        self.assertEqual(engine.states(7), [("a", "Approach"), ("b", "Pick")])
+        events = engine.step([7], np.array([[False, True]]), np.array([False]), None, 2.0)
+        self.assertEqual(events, [(7, "a", "Approach", 0.0, 2.0), (7, "a", "Leave", 2.0, 2.0)])
+        events = engine.step([], np.zeros((0, 2), dtype=bool), np.zeros(0, dtype=bool), None, 3.0)
+        self.assertEqual(
+            events,
+            [(7, "b", "Approach", 0.0, 3.0), (7, "b", "Pick", 0.5, 3.0), (7, "b", "Leave", 3.0, 3.0)],
+        )
+        self.assertEqual(len(engine), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import csv
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from src.exporters import CsvSink, JsonArraySink, JsonLinesSink, json_sink, write_csv, write_json
+
+
+def make_rows(n):
+    return [
+        {"frame": i, "time_ms": i * 33.3, "track_id": i % 7, "score": 0.5, "cls": 0, "bbox": (i, 2.0, i + 10, 20.0)}
+        for i in range(n)
+    ]
+
+
+class StreamingSinkTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tempdir.name)
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def _stream(self, sink, rows, chunk=13):
+        for start in range(0, len(rows), chunk):
+            sink.write_many(rows[start : start + chunk])
+        sink.close()
+
+    def test_outputs_match_batch_writers(self):
+        rows = make_rows(300)
+        write_csv(self.tmp_path / "ref.csv", rows)
+        write_json(self.tmp_path / "ref.json", rows)
+        self._stream(CsvSink(self.tmp_path / "out.csv", batch_rows=50), rows)
+        self._stream(JsonArraySink(self.tmp_path / "out.json", batch_rows=50), rows)
+        self._stream(JsonLinesSink(self.tmp_path / "out.jsonl", batch_rows=50), rows)
+        self.assertEqual((self.tmp_path / "out.csv").read_text(), (self.tmp_path / "ref.csv").read_text())
+        expected = json.loads((self.tmp_path / "ref.json").read_text())
+        self.assertEqual(json.loads((self.tmp_path / "out.json").read_text()), expected)
+        lines = (self.tmp_path / "out.jsonl").read_text().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_empty_outputs(self):
+        CsvSink(self.tmp_path / "empty.csv").close()
+        json_sink(self.tmp_path / "empty.json").close()
+        json_sink(self.tmp_path / "empty.jsonl").close()
+        self.assertEqual((self.tmp_path / "empty.csv").read_text(), "")
+        self.assertEqual(json.loads((self.tmp_path / "empty.json").read_text()), [])
+        self.assertEqual((self.tmp_path / "empty.jsonl").read_text(), "")
+
+    def test_time_policy_flushes_before_close(self):
+        sink = CsvSink(self.tmp_path / "live.csv", batch_rows=10_000, flush_seconds=0.05)
+        sink.write_many(make_rows(3))
+        deadline = time.monotonic() + 2.0
+        while sink.rows_written < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with (self.tmp_path / "live.csv").open(newline="") as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 3)
+        sink.close()
+
+    def test_write_errors_surface_on_close(self):
+        (self.tmp_path / "taken").mkdir()
+        sink = CsvSink(self.tmp_path / "taken", batch_rows=1)
+        sink._thread.join()
+        with self.assertRaises(RuntimeError):
+            sink.write_many(make_rows(1))
+        with self.assertRaises(RuntimeError):
+            sink.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import csv
+import unittest
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # pragma: no cover
+    cv2 = None
+    np = None
+
+
+@unittest.skipUnless(cv2 is not None and np is not None, "OpenCV y NumPy requeridos")
+class MotionGateTests(unittest.TestCase):
+    @staticmethod
+    def _frame(x=None):
+        frame = np.full((240, 320, 3), 40, dtype=np.uint8)
+        if x is not None:
+            frame[100:160, x : x + 40] = 230
+        return frame
+
+    def test_static_frames_are_skipped(self):
+        from src.config import MotionConfig
+        from src.motion import MotionGate
+
+        gate = MotionGate(MotionConfig(enabled=True, max_skip=0))
+        decisions = [gate.should_detect(self._frame()) for _ in range(5)]
+        self.assertEqual(decisions, [True, False, False, False, False])
+        self.assertTrue(gate.should_detect(self._frame(x=100)))
+        self.assertFalse(gate.should_detect(self._frame(x=100)))
+        self.assertAlmostEqual(gate.skip_ratio, 5 / 7)
+
+    def test_slow_drift_accumulates_against_last_detection(self):
+        from src.config import MotionConfig
+        from src.motion import MotionGate
+
+        gate = MotionGate(MotionConfig(enabled=True, threshold=0.01, max_skip=0))
+        gate.should_detect(self._frame(x=100))
+        decisions = [gate.should_detect(self._frame(x=100 + step)) for step in range(1, 10)]
+        self.assertFalse(decisions[0])
+        self.assertIn(True, decisions)
+
+    def test_max_skip_forces_detection(self):
+        from src.config import MotionConfig
+        from src.motion import MotionGate
+
+        gate = MotionGate(MotionConfig(enabled=True, max_skip=2))
+        decisions = [gate.should_detect(self._frame()) for _ in range(7)]
+        self.assertEqual(decisions, [True, False, False, True, False, False, True])
+
+
+    def test_pipeline_coasts_tracks_on_static_frames(self):
+        import tempfile
+        from dataclasses import replace
+        from pathlib import Path
+        from unittest import mock
+
+        from src import pipeline as pipeline_module
+        from src.config import ExportConfig, MotionConfig, mode_defaults
+        from src.detector_onnx import Detection
+
+        calls = []
+
+        class CountingDetector:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def __call__(self, image):
+                calls.append(1)
+                return [Detection(bbox=(100.0, 100.0, 140.0, 160.0), score=0.9, cls=0)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            video = Path(tmp) / "static.avi"
+            writer = cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (320, 240))
+            for _ in range(10):
+                writer.write(self._frame(x=100))
+            writer.release()
+            defaults = mode_defaults("fast")
+            config = replace(
+                defaults,
+                source=str(video),
+                video=replace(defaults.video, every_n_frames=1),
+                motion=MotionConfig(enabled=True, max_skip=0),
+                export=ExportConfig(csv_path=Path(tmp) / "tracks.csv"),
+            )
+            with mock.patch.object(pipeline_module, "OnnxDetector", CountingDetector):
+                pipe = pipeline_module.Pipeline(config)
+                pipe.run()
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(pipe.motion_gate.skipped, 9)
+            with (Path(tmp) / "tracks.csv").open(newline="") as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual(len(rows), 10)
+            self.assertEqual({row["track_id"] for row in rows}, {"1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
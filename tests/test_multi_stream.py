@@ -0,0 +1,110 @@
+import csv
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from unittest import mock
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover
+    cv2 = None
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class BlobDetector:
+    """Una caja por mancha blanca; cuenta llamadas para verificar el batch entre fuentes."""
+
+    batch_calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, image):
+        from src.detector_onnx import Detection
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        count, _, stats, _ = cv2.connectedComponentsWithStats((gray > 127).astype(np.uint8))
+        return [Detection(bbox=(float(x), float(y), float(x + w), float(y + h)), score=0.9, cls=0) for x, y, w, h, _ in stats[1:count]]
+
+    def detect_batch(self, images):
+        BlobDetector.batch_calls += 1
+        return [self(image) for image in images]
+
+
+@unittest.skipUnless(cv2 and np, "OpenCV y NumPy requeridos para pruebas de video")
+class MultiStreamTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tempdir.name)
+        self.videos = [self._make_video("a.avi", frames=12, speed=3), self._make_video("b.avi", frames=8, speed=-2)]
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def _make_video(self, name, frames, speed):
+        path = self.tmp_path / name
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (128, 64))
+        for i in range(frames):
+            frame = np.zeros((64, 128, 3), dtype=np.uint8)
+            x = 50 + speed * i
+            frame[10:40, x : x + 16] = 255
+            writer.write(frame)
+        writer.release()
+        return str(path)
+
+    def _config(self, **kwargs):
+        from src.config import mode_defaults
+
+        defaults = mode_defaults("fast")
+        return replace(
+            defaults,
+            model_path=self.tmp_path / "model.onnx",
+            video=replace(defaults.video, every_n_frames=1),
+            **kwargs,
+        )
+
+    @staticmethod
+    def _read(path):
+        with Path(path).open() as f:
+            return list(csv.reader(f))
+
+    def test_streams_match_individual_runs(self):
+        from src import pipeline as pipeline_module
+        from src import multi_stream
+        from src.config import ExportConfig
+
+        with mock.patch.object(pipeline_module, "OnnxDetector", BlobDetector), mock.patch.object(
+            multi_stream, "OnnxDetector", BlobDetector
+        ):
+            for i, video in enumerate(self.videos):
+                pipeline_module.Pipeline(
+                    self._config(source=video, export=ExportConfig(csv_path=self.tmp_path / f"single_{i}.csv"))
+                ).run()
+            BlobDetector.batch_calls = 0
+            multi_stream.MultiStreamPipeline(
+                self._config(
+                    source=self.videos[0],
+                    sources=tuple(self.videos),
+                    export=ExportConfig(csv_path=self.tmp_path / "multi.csv"),
+                )
+            ).run()
+
+        self.assertEqual(BlobDetector.batch_calls, 8)  # vueltas con ambas fuentes activas
+        for i in range(2):
+            self.assertEqual(self._read(self.tmp_path / f"multi_{i}.csv"), self._read(self.tmp_path / f"single_{i}.csv"))
+
+    def test_cli_sources(self):
+        from run import build_config, parse_args
+
+        args = parse_args(["--model-path", "m.onnx", "--sources", *self.videos])
+        config = build_config(args)
+        self.assertEqual(config.sources, tuple(self.videos))
+        self.assertEqual(config.source, self.videos[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
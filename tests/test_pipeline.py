@@ -63,6 +63,24 @@ class PipelineTests(unittest.TestCase):
         self.assertEqual(args.source, str(self.video_path))
         self.assertTrue(args.dry_run)
 
+    def test_cli_session_tuning(self):
+        args = parse_args(
+            [
+                "--model-path",
+                str(self.model_path),
+                "--intra-op-threads",
+                "6",
+                "--pose-intra-op-threads",
+                "2",
+                "--spin",
+                "off",
+            ]
+        )
+        config = build_config(args)
+        self.assertEqual(config.detector.session.intra_op_threads, 6)
+        self.assertFalse(config.detector.session.allow_spinning)
+        self.assertEqual(config.pose.session.intra_op_threads, 2)
+
     def test_pipeline_runs_and_exports_empty_files(self):
         json_out = self.tmp_path / "out.json"
         csv_out = self.tmp_path / "out.csv"
@@ -95,5 +113,51 @@ class PipelineTests(unittest.TestCase):
         self.assertEqual(os.path.getsize(csv_out), 0)
 
 
+    def test_interpolated_rows_for_skipped_frames(self):
+        from src.detector_onnx import Detection
+        from src.pipeline import Pipeline
+        from src.video_io import FrameData
+
+        defaults = mode_defaults("fast")
+        config = replace(
+            defaults,
+            model_path=self.model_path,
+            output=None,
+            tracker=replace(defaults.tracker, interpolate=True),
+        )
+        pipeline = Pipeline(config, load_models=False)
+        image = np.zeros((64, 64, 3), dtype=np.uint8)
+        for idx in (0, 4):
+            det = Detection(bbox=(float(idx), 0.0, idx + 20.0, 20.0), score=0.9, cls=0)
+            pipeline._process_frame(FrameData(index=idx, image=image, timestamp_ms=idx * 100.0, fps=10.0), [det], 0.0)
+        rows = pipeline.export_buffer.rows
+        self.assertEqual([r["frame"] for r in rows], [0, 1, 2, 3, 4])
+        self.assertEqual([r["interpolated"] for r in rows], [False, True, True, True, False])
+        self.assertEqual(rows[2]["bbox"], (2.0, 0.0, 22.0, 20.0))
+        self.assertEqual(rows[3]["time_ms"], 300.0)
+        self.assertTrue(all(r["track_id"] == 1 for r in rows))
+
+
+    def test_retired_tracks_close_interactions_and_free_state(self):
+        from src.pipeline import Pipeline
+        from src.tracker import Track
+
+        rois_path = self.tmp_path / "rois.json"
+        rois_path.write_text(json.dumps([{"id": "shelf", "rect": [0, 0, 50, 50]}]))
+        config = replace(mode_defaults("fast"), model_path=self.model_path, output=None, rois_path=rois_path)
+        pipeline = Pipeline(config, load_models=False)
+        inside = Track(track_id=1, bbox=(10.0, 10.0, 30.0, 30.0), score=0.9, cls=0)
+        outside = Track(track_id=2, bbox=(100.0, 100.0, 120.0, 120.0), score=0.9, cls=0)
+        for t in (0.0, 0.5, 1.5):
+            pipeline._update_interactions([inside, outside], t, None)
+        self.assertEqual(len(pipeline.interactions), 1)
+        self.assertEqual(pipeline._track_labels(1), ["ID 1", "Approach@shelf"])
+        # El track 1 desaparece de la lista del tracker: se emiten sus eventos pendientes.
+        pipeline._update_interactions([outside], 2.0, None)
+        events = [(e["track_id"], e["event_type"], e["t_start"], e["t_end"]) for e in pipeline.export_buffer.events]
+        self.assertEqual(events, [(1, "Approach", 0.0, 2.0), (1, "Leave", 2.0, 2.0)])
+        self.assertEqual(len(pipeline.interactions), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
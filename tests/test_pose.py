@@ -0,0 +1,126 @@
+import json
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from src.config import PoseConfig, mode_defaults
+from src.detector_onnx import LetterboxPreprocessor
+from src.pose import OnnxPoseEstimator, PoseResult
+from src.tracker import Track
+
+
+class _Input:
+    name = "images"
+    shape = ["batch", 3, 64, 64]
+
+
+class _Output:
+    name = "keypoints"
+
+
+class CenterPoseSession:
+    """Devuelve 17 keypoints en el centro del tensor de entrada para cada elemento del batch."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_inputs(self):
+        return [_Input()]
+
+    def get_outputs(self):
+        return [_Output()]
+
+    def run(self, output_names, feeds):
+        batch = feeds["images"]
+        self.calls.append(batch.shape[0])
+        size = batch.shape[-1]
+        preds = np.zeros((batch.shape[0], 17, 3), dtype=np.float32)
+        preds[:, :, :2] = size / 2
+        preds[:, :, 2] = 0.9
+        return [preds]
+
+
+def make_estimator(config: PoseConfig, session=None) -> OnnxPoseEstimator:
+    estimator = OnnxPoseEstimator.__new__(OnnxPoseEstimator)
+    estimator.config = config
+    estimator.session = session or CenterPoseSession()
+    estimator.fixed_batch = None
+    estimator.preprocessor = LetterboxPreprocessor(config.imgsz, max_batch=config.max_batch)
+    estimator.input_name = "images"
+    estimator.output_names = ["keypoints"]
+    return estimator
+
+
+class EstimateCropsTests(unittest.TestCase):
+    def test_crops_are_batched_and_mapped_to_frame(self):
+        config = PoseConfig(imgsz=64, crop_margin=0.0, max_batch=8)
+        estimator = make_estimator(config)
+        image = np.zeros((200, 300, 3), dtype=np.uint8)
+        boxes = [(10.0, 20.0, 50.0, 100.0), (200.0, 40.0, 260.0, 160.0), (120.0, 0.0, 140.0, 30.0)]
+        poses = estimator.estimate_crops(image, boxes)
+        self.assertEqual(estimator.session.calls, [3])
+        for (x1, y1, x2, y2), pose in zip(boxes, poses):
+            x, y, score = pose.wrists()[0]
+            self.assertAlmostEqual(x, (x1 + x2) / 2, delta=1.0)
+            self.assertAlmostEqual(y, (y1 + y2) / 2, delta=1.0)
+            self.assertAlmostEqual(score, 0.9, places=5)
+
+    def test_chunks_and_empty_crops(self):
+        estimator = make_estimator(PoseConfig(imgsz=64, max_batch=2))
+        image = np.zeros((100, 100, 3), dtype=np.uint8)
+        boxes = [(0.0, 0.0, 20.0, 20.0)] * 3 + [(150.0, 150.0, 180.0, 180.0)]
+        poses = estimator.estimate_crops(image, boxes)
+        self.assertEqual(estimator.session.calls, [2, 1])
+        self.assertIsNone(poses[3])
+        self.assertTrue(all(isinstance(p, PoseResult) for p in poses[:3]))
+
+
+class WristStubEstimator:
+    """Muñecas en el centro de la caja solo para el primer recorte; el resto, lejos de todo ROI."""
+
+    def __init__(self):
+        self.boxes = []
+
+    def estimate_crops(self, image, boxes):
+        self.boxes.append(list(boxes))
+        poses = []
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            x, y = ((x1 + x2) / 2, (y1 + y2) / 2) if i == 0 else (500.0, 500.0)
+            poses.append(PoseResult(keypoints=[(0.0, 0.0, 0.0)] * 9 + [(x, y, 0.9), (x, y, 0.9)]))
+        return poses
+
+
+class TopDownPipelineTests(unittest.TestCase):
+    def test_pose_only_for_tracks_inside_rois_and_pick_per_track(self):
+        from src.pipeline import Pipeline
+
+        with tempfile.TemporaryDirectory() as tmp:
+            rois_path = Path(tmp) / "rois.json"
+            rois_path.write_text(json.dumps([{"id": "shelf", "rect": [0, 0, 100, 100]}]))
+            defaults = mode_defaults("fast")
+            config = replace(
+                defaults,
+                model_path=Path(tmp) / "model.onnx",
+                output=None,
+                rois_path=rois_path,
+                pose=replace(defaults.pose, enabled=True),
+            )
+            stub = WristStubEstimator()
+            pipeline = Pipeline(config, load_models=False, pose_estimator=stub)
+        image = np.zeros((300, 300, 3), dtype=np.uint8)
+        a = Track(track_id=1, bbox=(10.0, 10.0, 40.0, 60.0), score=0.9, cls=0)
+        b = Track(track_id=2, bbox=(50.0, 10.0, 80.0, 60.0), score=0.9, cls=0)
+        outside = Track(track_id=3, bbox=(200.0, 200.0, 240.0, 260.0), score=0.9, cls=0)
+        pipeline._estimate_track_poses(image, [a, b, outside])
+        self.assertEqual(stub.boxes, [[a.bbox, b.bbox]])
+        self.assertIsNone(outside.pose)
+        pipeline._update_interactions([a, b, outside], 0.0, None)
+        labels = {tid: pipeline._track_labels(tid) for tid in (1, 2, 3)}
+        self.assertEqual(labels, {1: ["ID 1", "Pick@shelf"], 2: ["ID 2", "In@shelf"], 3: ["ID 3"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from src.rois import ROI, ROIMask, crop_regions
+
+
+def rect(roi_id, x1, y1, x2, y2):
+    return ROI(roi_id=roi_id, points=((x1, y1), (x2, y1), (x2, y2), (x1, y2)))
+
+
+class CropRegionsTests(unittest.TestCase):
+    def test_margin_and_clipping(self):
+        regions = crop_regions([rect("a", 10, 20, 110, 60)], (100, 200), margin=0.25)
+        self.assertEqual(regions, [(0, 10, 135, 70)])
+
+    def test_overlapping_regions_are_merged(self):
+        rois = [rect("a", 0, 0, 50, 50), rect("b", 40, 40, 90, 90), rect("c", 150, 0, 190, 40)]
+        regions = crop_regions(rois, (200, 200), margin=0.0)
+        self.assertEqual(sorted(regions), [(0, 0, 90, 90), (150, 0, 190, 40)])
+
+
+
+class ROIMaskTests(unittest.TestCase):
+    def test_matches_ray_casting_away_from_edges(self):
+        rois = [
+            ROI(roi_id="tri", points=((10.0, 10.0), (120.0, 30.0), (40.0, 110.0))),
+            rect("a", 30, 20, 90, 80),
+            rect("b", 60, 50, 150, 140),
+        ]
+        mask = ROIMask(rois, (160, 200))
+        rng = np.random.default_rng(0)
+        pts = rng.uniform(0, 160, (2000, 2))
+        got = mask.lookup(pts[:, 0], pts[:, 1])
+        for (x, y), row in zip(pts, got):
+            # Los píxeles del borde pueden diferir; se comparan puntos claramente dentro/fuera.
+            offsets = [(dx, dy) for dx in (-1.5, 1.5) for dy in (-1.5, 1.5)]
+            near = any(roi.contains(x + dx, y + dy) != roi.contains(x, y) for roi in rois for dx, dy in offsets)
+            if not near:
+                self.assertEqual(row.tolist(), [roi.contains(x, y) for roi in rois])
+
+    def test_overlaps_and_outside_points(self):
+        mask = ROIMask([rect("a", 0, 0, 50, 50), rect("b", 40, 40, 90, 90)])
+        got = mask.lookup([45, 10, 80, 500, -3], [45, 10, 80, 10, 5])
+        self.assertEqual(got.tolist(), [[True, True], [True, False], [False, True], [False, False], [False, False]])
+        self.assertEqual(mask.shape, (91, 91))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import csv
+import tempfile
+import unittest
+from dataclasses import replace
+from pathlib import Path
+from unittest import mock
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover
+    cv2 = None
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class BlobDetector:
+    """Detecta cada mancha blanca del frame como una caja (sin ONNX)."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, image):
+        from src.detector_onnx import Detection
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        count, _, stats, _ = cv2.connectedComponentsWithStats((gray > 127).astype(np.uint8))
+        detections = []
+        for x, y, w, h, _ in stats[1:count]:
+            detections.append(Detection(bbox=(float(x), float(y), float(x + w), float(y + h)), score=0.9, cls=0))
+        return detections
+
+
+@unittest.skipUnless(cv2 and np, "OpenCV y NumPy requeridos para pruebas de video")
+class SegmentedRunTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tempdir.name)
+        self.video_path = self.tmp_path / "moving.avi"
+        writer = cv2.VideoWriter(str(self.video_path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (160, 96))
+        for i in range(60):
+            frame = np.zeros((96, 160, 3), dtype=np.uint8)
+            x = 5 + i
+            frame[20:50, x : x + 20] = 255
+            if 15 <= i < 45:  # segundo objeto que aparece y desaparece
+                frame[60:90, 150 - 4 * (i - 15) : 170 - 4 * (i - 15)] = 255
+            writer.write(frame)
+        writer.release()
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def _config(self, name):
+        from src.config import ExportConfig, ParallelConfig, mode_defaults
+
+        rois = self.tmp_path / "rois.json"
+        rois.write_text('[{"id": "shelf", "rect": [60, 0, 120, 96]}]')
+        return replace(
+            mode_defaults("fast"),
+            model_path=self.tmp_path / "model.onnx",
+            source=str(self.video_path),
+            rois_path=rois,
+            video=replace(mode_defaults("fast").video, every_n_frames=2),
+            export=ExportConfig(csv_path=self.tmp_path / f"{name}.csv", events_path=self.tmp_path / f"{name}_events.csv"),
+            parallel=ParallelConfig(segments=3, workers=1, overlap_seconds=1.0),
+        )
+
+    @staticmethod
+    def _read(path):
+        with path.open() as f:
+            return list(csv.reader(f))
+
+    def test_plan_segments_aligned_and_overlapping(self):
+        from src.segments import plan_segments
+
+        plan = plan_segments(100, 3, overlap_frames=10, every_n=3)
+        self.assertEqual(plan[0].start, 0)
+        self.assertEqual(plan[-1].end, 100)
+        for prev, seg in zip(plan, plan[1:]):
+            self.assertEqual(prev.end, seg.owned_start)
+            self.assertEqual(seg.owned_start % 3, 0)
+            self.assertEqual(seg.start % 3, 0)
+            self.assertLessEqual(seg.start, seg.owned_start - 9)
+
+    def test_segmented_exports_equal_continuous_run(self):
+        from src import pipeline as pipeline_module
+        from src.segments import run_segmented
+
+        with mock.patch.object(pipeline_module, "OnnxDetector", BlobDetector):
+            continuous = self._config("continuous")
+            pipeline_module.Pipeline(continuous).run()
+            run_segmented(self._config("inline"))
+            run_segmented(replace(self._config("pooled"), parallel=replace(self._config("pooled").parallel, workers=3)))
+
+        expected = self._read(self.tmp_path / "continuous.csv")
+        self.assertGreater(len(expected), 30)
+        self.assertEqual(self._read(self.tmp_path / "inline.csv"), expected)
+        self.assertEqual(self._read(self.tmp_path / "pooled.csv"), expected)
+        events = self._read(self.tmp_path / "continuous_events.csv")
+        self.assertGreater(len(events), 1)
+        self.assertEqual(self._read(self.tmp_path / "inline_events.csv"), events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from src.config import TrackerConfig
+from src.detector_onnx import Detection
+from src.detector_onnx import pairwise_iou
+from src.tracker import (
+    IoUTracker,
+    KalmanTracker,
+    SpatialGrid,
+    TrackHistory,
+    _hungarian,
+    associate,
+    build_tracker,
+)
+
+
+def brute_force_cost(cost):
+    n, m = cost.shape
+    best = np.inf
+    for cols in itertools.permutations(range(m), n):
+        best = min(best, sum(cost[i, c] for i, c in enumerate(cols)))
+    return best
+
+
+class AssignmentTests(unittest.TestCase):
+    def test_hungarian_is_optimal(self):
+        rng = np.random.default_rng(5)
+        for n, m in [(1, 1), (3, 3), (4, 6), (5, 5), (2, 7)]:
+            for _ in range(10):
+                cost = rng.uniform(0, 1, (n, m))
+                pairs = _hungarian(cost)
+                self.assertEqual(len(pairs), n)
+                self.assertEqual(len({c for _, c in pairs}), n)
+                self.assertAlmostEqual(sum(cost[r, c] for r, c in pairs), brute_force_cost(cost))
+
+    def test_associate_respects_threshold_and_methods(self):
+        iou = np.array(
+            [
+                [0.6, 0.5, 0.0],
+                [0.55, 0.0, 0.0],
+                [0.0, 0.0, 0.1],
+            ]
+        )
+        self.assertEqual(sorted(associate(iou, 0.3, "hungarian")), [(0, 1), (1, 0)])
+        self.assertEqual(sorted(associate(iou, 0.3, "greedy")), [(0, 0)])
+        with self.assertRaises(ValueError):
+            associate(iou, 0.3, "auction")
+
+
+class IoUTrackerTests(unittest.TestCase):
+    @staticmethod
+    def _det(x1, y1, x2, y2):
+        return Detection(bbox=(x1, y1, x2, y2), score=0.9, cls=0)
+
+    def test_optimal_assignment_keeps_both_ids_in_crowds(self):
+        tracker = IoUTracker(TrackerConfig(iou_match=0.3))
+        tracker.update([self._det(0, 0, 10, 10), self._det(8, 0, 18, 10)])
+        # El emparejamiento voraz por track daría al track 1 su mejor caja (3..13),
+        # que es la única candidata del track 2, y este perdería su ID.
+        tracks = tracker.update([self._det(3, 0, 13, 10), self._det(-4, 0, 6, 10)])
+        ids = {t.track_id: t.bbox for t in tracks}
+        self.assertEqual(set(ids), {1, 2})
+        self.assertEqual(ids[1], (-4, 0, 6, 10))
+        self.assertEqual(ids[2], (3, 0, 13, 10))
+
+    def test_unmatched_tracks_and_detections(self):
+        tracker = IoUTracker(TrackerConfig(max_missed=1))
+        tracker.update([self._det(0, 0, 10, 10)])
+        tracks = tracker.update([self._det(50, 50, 60, 60)])
+        self.assertEqual(sorted(t.track_id for t in tracks), [1, 2])
+        self.assertEqual(tracker.tracks[1].misses, 1)
+        tracks = tracker.update([])
+        self.assertEqual([t.track_id for t in tracks], [2])
+
+
+
+def random_boxes(rng, n, extent=500.0):
+    xy = rng.uniform(0, extent, (n, 2))
+    wh = rng.uniform(10, 60, (n, 2))
+    return np.concatenate([xy, xy + wh], axis=1)
+
+
+class SpatialGridTests(unittest.TestCase):
+    def test_candidates_cover_all_overlapping_pairs(self):
+        rng = np.random.default_rng(3)
+        tracks, dets = random_boxes(rng, 80), random_boxes(rng, 60)
+        grid = SpatialGrid(cell_size=40.0)
+        grid.sync(list(range(80)), tracks)
+        keys, idx = grid.candidates(dets)
+        found = set(zip(keys, idx))
+        overlapping = set(zip(*np.nonzero(pairwise_iou(tracks, dets) > 0)))
+        self.assertTrue(overlapping <= found)
+        self.assertLess(len(found), 80 * 60)
+
+    def test_sync_moves_and_remove_clears_cells(self):
+        grid = SpatialGrid(cell_size=10.0)
+        grid.sync([1], np.array([[0, 0, 5, 5]]))
+        grid.sync([1], np.array([[100, 100, 105, 105]]))
+        self.assertEqual(grid.candidates(np.array([[1, 1, 4, 4]])), ([], []))
+        self.assertEqual(grid.candidates(np.array([[101, 101, 104, 104]])), ([1], [0]))
+        grid.remove(1)
+        self.assertEqual(len(grid), 0)
+        self.assertEqual(grid.cells, {})
+
+    def test_grid_tracker_matches_dense_tracker(self):
+        rng = np.random.default_rng(7)
+        boxes = random_boxes(rng, 120, extent=800.0)
+        vel = rng.normal(0, 4, (120, 2))
+        dense = IoUTracker(TrackerConfig(grid_min_tracks=0))
+        grid = IoUTracker(TrackerConfig(grid_min_tracks=10))
+        for _ in range(15):
+            boxes = boxes + np.tile(vel, 2)
+            order = rng.permutation(len(boxes))[: len(boxes) - 5]
+            dets = [Detection(bbox=tuple(boxes[i].tolist()), score=0.9, cls=0) for i in order]
+            a = {t.track_id: t.bbox for t in dense.update(dets)}
+            b = {t.track_id: t.bbox for t in grid.update(dets)}
+            self.assertEqual(a, b)
+        self.assertIsNotNone(grid._grid)
+        # Los tracks eliminados salen del índice; los nuevos entran en la siguiente asociación.
+        self.assertLessEqual(set(grid._grid._ranges), set(grid.tracks))
+
+
+class TrackHistoryTests(unittest.TestCase):
+    def test_ring_buffer_keeps_last_boxes_in_order(self):
+        history = TrackHistory(capacity=3)
+        self.assertFalse(history)
+        for i in range(5):
+            history.append((i, 0, i + 10, 10), frame=i)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history[-1], (4.0, 0.0, 14.0, 10.0))
+        self.assertEqual(history[0], (2.0, 0.0, 12.0, 10.0))
+        self.assertEqual(history.frames().tolist(), [2, 3, 4])
+        self.assertEqual([box[0] for box in history], [2.0, 3.0, 4.0])
+        with self.assertRaises(IndexError):
+            history[3]
+
+    def test_velocity_uses_frame_indices(self):
+        history = TrackHistory.from_boxes([(0, 0, 10, 10), (8, 4, 18, 14)], frames=[0, 4])
+        self.assertEqual(history.velocity(), (2.0, 1.0))
+        self.assertEqual(TrackHistory().velocity(), (0.0, 0.0))
+
+    def test_tracker_history_is_bounded(self):
+        tracker = IoUTracker(TrackerConfig(history_size=4))
+        for i in range(50):
+            (track,) = tracker.update([Detection(bbox=(i, 0.0, i + 20.0, 20.0), score=0.9, cls=0)], frame_gap=2)
+        self.assertEqual(len(track.history), 4)
+        self.assertEqual(track.history[-1], (48.0, 0.0, 68.0, 20.0))
+        self.assertAlmostEqual(track.history.velocity()[0], 0.5)
+
+
+class KalmanTrackerTests(unittest.TestCase):
+    @staticmethod
+    def _box_at(x):
+        return Detection(bbox=(x, 0.0, x + 40.0, 40.0), score=0.9, cls=0)
+
+    def _run(self, tracker):
+        # 15 px/frame: primero todos los frames, luego uno de cada 4 (60 px > ancho de la caja).
+        frames = [0, 1, 2, 3, 4, 8, 12, 16, 20]
+        ids = []
+        last = None
+        for idx in frames:
+            gap = idx - last if last is not None else 1
+            tracks = tracker.update([self._box_at(15.0 * idx)], frame_gap=gap)
+            ids.append(sorted(t.track_id for t in tracks if t.misses == 0))
+            last = idx
+        return ids
+
+    def test_keeps_id_of_fast_object_across_skipped_frames(self):
+        ids = self._run(KalmanTracker(TrackerConfig(iou_match=0.3)))
+        self.assertTrue(all(frame_ids == [1] for frame_ids in ids), ids)
+
+    def test_iou_tracker_loses_fast_object(self):
+        ids = self._run(IoUTracker(TrackerConfig(iou_match=0.3)))
+        self.assertNotEqual(ids[-1], [1])
+
+    def test_unmatched_track_moves_to_prediction_and_state_is_dropped(self):
+        tracker = KalmanTracker(TrackerConfig(max_missed=1))
+        for idx in range(4):
+            tracker.update([self._box_at(10.0 * idx)])
+        (track,) = tracker.update([])
+        self.assertEqual(track.misses, 1)
+        self.assertGreater(track.bbox[0], 30.0)
+        tracker.update([])
+        self.assertEqual(tracker.tracks, {})
+        self.assertEqual(tracker._mean, {})
+
+    def test_build_tracker(self):
+        self.assertIsInstance(build_tracker(TrackerConfig(kind="kalman")), KalmanTracker)
+        self.assertIs(type(build_tracker(TrackerConfig())), IoUTracker)
+        with self.assertRaises(ValueError):
+            build_tracker(TrackerConfig(kind="sort"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover
+    cv2 = None
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+@unittest.skipUnless(cv2 and np, "OpenCV y NumPy requeridos para pruebas de video")
+class IterFramesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.video_path = Path(self.tempdir.name) / "test.avi"
+        fourcc = cv2.VideoWriter_fourcc(*"MJPG")
+        writer = cv2.VideoWriter(str(self.video_path), fourcc, 10.0, (64, 48))
+        for i in range(12):
+            frame = np.full((48, 64, 3), i * 20, dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def test_every_n_and_max_frames(self):
+        from src.video_io import iter_frames
+
+        indices = [f.index for f in iter_frames(str(self.video_path), every_n=3)]
+        self.assertEqual(indices, [0, 3, 6, 9])
+        indices = [f.index for f in iter_frames(str(self.video_path), every_n=2, max_frames=2)]
+        self.assertEqual(indices, [0, 2])
+
+    def test_seek_stride_matches_grab_stride(self):
+        from src.video_io import iter_frames
+
+        grabbed = list(iter_frames(str(self.video_path), every_n=4))
+        seeked = list(iter_frames(str(self.video_path), every_n=4, seek_stride=3))
+        self.assertEqual([f.index for f in seeked], [0, 4, 8])
+        self.assertEqual([f.index for f in seeked], [f.index for f in grabbed])
+        for a, b in zip(grabbed, seeked):
+            self.assertTrue(np.array_equal(a.image, b.image))
+
+    def test_prefetch_block_matches_sync_read(self):
+        from src.video_io import iter_frames
+
+        sync = list(iter_frames(str(self.video_path), every_n=2))
+        prefetched = list(iter_frames(str(self.video_path), every_n=2, prefetch=2, drop_policy="block"))
+        self.assertEqual([f.index for f in prefetched], [f.index for f in sync])
+        for a, b in zip(sync, prefetched):
+            self.assertTrue(np.array_equal(a.image, b.image))
+
+    def test_prefetch_early_stop_and_errors(self):
+        from src.video_io import FramePrefetcher, iter_frames
+
+        frames = iter_frames(str(self.video_path), prefetch=1, drop_policy="block")
+        first = next(frames)
+        self.assertEqual(first.index, 0)
+        frames.close()
+
+        # Con "oldest" pueden perderse frames, pero el orden se conserva.
+        indices = [f.index for f in iter_frames(str(self.video_path), prefetch=1, drop_policy="oldest")]
+        self.assertEqual(indices, sorted(indices))
+        self.assertEqual(indices[-1], 11)
+
+        def failing():
+            yield from ()
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            list(FramePrefetcher(failing(), depth=1))
+        with self.assertRaises(ValueError):
+            FramePrefetcher(iter([]), depth=1, drop_policy="random")
+
+
+if __name__ == "__main__":
+    unittest.main()
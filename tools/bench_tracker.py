@@ -0,0 +1,91 @@
+"""Benchmark de asociación del IoUTracker con 50, 200 y 1000 tracks (matriz completa y rejilla).
+
+Uso:
+    python -m tools.bench_tracker --tracks 50 200 1000 --frames 20
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.config import TrackerConfig
+from src.detector_onnx import Detection
+from src.tracker import IoUTracker, bbox_iou
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de asociación tracks × detecciones.")
+    parser.add_argument("--tracks", type=int, nargs="+", default=[50, 200, 1000], help="Número de objetos simulados.")
+    parser.add_argument("--frames", type=int, default=20, help="Frames simulados por escenario.")
+    parser.add_argument("--width", type=int, default=1920, help="Ancho de la escena.")
+    parser.add_argument("--height", type=int, default=1080, help="Alto de la escena.")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def simulate(n: int, frames: int, width: int, height: int, rng: np.random.Generator) -> List[List[Detection]]:
+    """Objetos de 30-80 px que se desplazan algunos píxeles por frame, en orden aleatorio."""
+    size = rng.uniform(30, 80, (n, 2))
+    pos = rng.uniform(0, 1, (n, 2)) * (np.array([width, height]) - size)
+    vel = rng.normal(0, 3, (n, 2))
+    sequence = []
+    for _ in range(frames):
+        pos = pos + vel
+        boxes = np.concatenate([pos, pos + size], axis=1)
+        order = rng.permutation(n)
+        sequence.append([Detection(bbox=tuple(boxes[i].tolist()), score=0.9, cls=0) for i in order])
+    return sequence
+
+
+def nested_loop_associate(tracks, detections, iou_match: float) -> int:
+    """Asociación anterior (bucle Python tracks × detecciones con bbox_iou), como referencia."""
+    used = [False] * len(detections)
+    matched = 0
+    for track in tracks:
+        best_iou, best_j = 0.0, -1
+        for j, det in enumerate(detections):
+            if used[j]:
+                continue
+            iou = bbox_iou(track.bbox, det.bbox)
+            if iou > best_iou:
+                best_iou, best_j = iou, j
+        if best_iou >= iou_match and best_j >= 0:
+            used[best_j] = True
+            matched += 1
+    return matched
+
+
+def main() -> None:
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    print(f"{'tracks':>7} | {'método':>10} | {'ms/frame':>9} | {'IDs creados':>11}")
+    for n in args.tracks:
+        sequence = simulate(n, args.frames, args.width, args.height, rng)
+        variants = [
+            ("hungarian", TrackerConfig(assignment="hungarian", grid_min_tracks=0)),
+            ("greedy", TrackerConfig(assignment="greedy", grid_min_tracks=0)),
+            ("rejilla", TrackerConfig(assignment="hungarian", grid_min_tracks=1)),
+        ]
+        for method, config in variants:
+            tracker = IoUTracker(config)
+            tracker.update(sequence[0])
+            start = time.perf_counter()
+            for detections in sequence[1:]:
+                tracker.update(detections)
+            elapsed = (time.perf_counter() - start) * 1e3 / (len(sequence) - 1)
+            print(f"{n:>7} | {method:>10} | {elapsed:>9.2f} | {tracker.next_id - 1:>11}")
+        tracker = IoUTracker(TrackerConfig())
+        tracker.update(sequence[0])
+        tracks = list(tracker.tracks.values())
+        start = time.perf_counter()
+        for detections in sequence[1:3]:
+            nested_loop_associate(tracks, detections, tracker.config.iou_match)
+        elapsed = (time.perf_counter() - start) * 1e3 / 2
+        print(f"{n:>7} | {'bucle ref.':>10} | {elapsed:>9.2f} | {'-':>11}")
+
+
+if __name__ == "__main__":
+    main()